@@ -9,8 +9,11 @@ import pandas as pd
 import sys
 import time
 import traceback
+import weakref
 
 from .callable_func import CallableFunc
+from .host_loader import HostCallableFunc
+from .platform_utilities import BuildSession
 from .hat_file import Function, HATFile
 from .function_info import FunctionInfo
 from .hat import load, generate_arg_sets_for_func
@@ -45,9 +48,35 @@ class Benchmark:
         self.hat_functions = self.func_dict.names
         self.working_dir = working_dir
 
+        # build the native profilers of all the host functions in one CMake project
+        self.build_session = BuildSession(dest_dir=working_dir or os.getcwd(), profile=True)
+        for benchmark_func in self.func_dict.values():
+            if isinstance(benchmark_func, HostCallableFunc):
+                benchmark_func.build_session = self.build_session
+        weakref.finalize(self, self.build_session.close)
+
         # create dictionary of function descriptions defined in the hat file
         self.function_descriptions = self.hat_package.hat_file.function_map
 
+    def prepare(self, function_names: List[str] = None, device_id: int = 0):
+        """Prepares the given functions (default: all functions) in one go, so that their native
+        profilers are built and their ROCm programs are compiled in parallel instead of one by one
+        when each function is run"""
+        dest_dir = self.working_dir or os.getcwd()
+        rocm_funcs = []
+        for function_name in function_names if function_names is not None else self.hat_functions:
+            benchmark_func = self.func_dict[function_name] if function_name in self.hat_functions else None
+            if isinstance(benchmark_func, HostCallableFunc):
+                benchmark_func.prepare_sources(dest_dir)
+            elif isinstance(benchmark_func, CallableFunc) and \
+                    self.function_descriptions[function_name].runtime == "ROCM":
+                rocm_funcs.append(benchmark_func)
+        self.build_session.build_pending()
+
+        if rocm_funcs:
+            from .rocm_loader import compile_rocm_programs
+            compile_rocm_programs(rocm_funcs, device_id)
+
     def run(
         self,
         function_name: str,
@@ -143,9 +172,11 @@ class Benchmark:
             perf_counter = get_perf_counter()
             print_verbose(verbose, f"[Benchmarking] Warming up for {warmup_iterations} iterations...")
 
-            for _ in range(warmup_iterations):
+            # each input set is verified during the first warmup pass, so the timing loop can skip it
+            for warmup_iteration in range(warmup_iterations):
                 for calling_args in input_sets:
-                    benchmark_func(*calling_args)
+                    benchmark_func(*calling_args, verify=warmup_iteration == 0)
+            verify_timed_calls = warmup_iterations == 0
 
             print_verbose(verbose, f"[Benchmarking] Timing for at least {min_time_in_sec}s and at least {min_timing_iterations} iterations...")
 
@@ -158,7 +189,7 @@ class Benchmark:
             while True:
                 batch_start_time_secs = perf_counter()
                 for _ in range(min_timing_iterations):
-                    benchmark_func(*input_sets[i])
+                    benchmark_func(*input_sets[i], verify=verify_timed_calls)
                     i = iterations % i_max
                     iterations += 1
                 end_time_secs = perf_counter()
@@ -231,6 +262,11 @@ def write_runtime_to_hat_file(hat_path, function_name, mean_time_secs):
         f.writelines(lines)
 
 
+def _skip_function(function_name):
+    # Skip init and debug functions
+    return "Initialize" in function_name or "_debug_check_allclose" in function_name
+
+
 def run_benchmark(
     hat_path,
     store_in_hat=False,
@@ -249,8 +285,9 @@ def run_benchmark(
 
     benchmark = Benchmark(hat_path, native_profiling, working_dir)
     functions = functions if functions is not None else benchmark.hat_functions
+    benchmark.prepare([f for f in functions if not _skip_function(f)], device_id)
     for function_name in functions:
-        if "Initialize" in function_name or "_debug_check_allclose" in function_name:    # Skip init and debug functions
+        if _skip_function(function_name):
             print(f"\nSkipping function: {function_name}")
             continue
 
@@ -3,6 +3,10 @@ import pathlib
 import sys
 import numpy as np
 from typing import List
+
+# defer loading of kernel symbols until their first launch
+os.environ.setdefault("CUDA_MODULE_LOADING", "LAZY")
+
 from cuda import cuda, nvrtc
 from .arg_info import ArgInfo
 from .callable_func import CallableFunc
@@ -93,57 +97,72 @@ def compile_cuda_program(cuda_src_path: pathlib.Path, func_name, device_id):
     return ptx
 
 
-def initialize_cuda(device_id):
-    # Initialize CUDA Driver API
-    err, = cuda.cuInit(0)
-    ASSERT_DRV(err)
+_CONTEXT_CACHE = {}
 
-    err, cuDevice = cuda.cuDeviceGet(device_id)
-    ASSERT_DRV(err)
 
-    # Create context
-    # TODO: USE cuDevicePrimaryCtxRetain for faster intialization
-    err, context = cuda.cuCtxCreate(0, cuDevice)
+def ensure_context(device_id):
+    "Returns the primary context of the device, initializing the driver on first use"
+    context = _CONTEXT_CACHE.get(device_id)
+    if context is None:
+        # Initialize CUDA Driver API
+        err, = cuda.cuInit(0)
+        ASSERT_DRV(err)
+
+        err, cuDevice = cuda.cuDeviceGet(device_id)
+        ASSERT_DRV(err)
+
+        # The primary context is shared by every kernel on the device and stays alive for the process
+        err, context = cuda.cuDevicePrimaryCtxRetain(cuDevice)
+        ASSERT_DRV(err)
+        _CONTEXT_CACHE[device_id] = context
+
+    return context
+
+
+def initialize_cuda(device_id):
+    context = ensure_context(device_id)
+    err, = cuda.cuCtxSetCurrent(context)
     ASSERT_DRV(err)
     return context
 
 
-def get_func_from_ptx(ptx, func_name):
-    # Load PTX as module data and retrieve function
+def load_module_from_ptx(ptx):
+    # Load PTX as module data
     ptx = np.char.array(ptx)
     err, ptx_mod = cuda.cuModuleLoadData(ptx)
     ASSERT_DRV(err)
+    return ptx_mod
+
+
+def get_func_from_module(ptx_mod, func_name):
     err, kernel = cuda.cuModuleGetFunction(ptx_mod, func_name.encode('utf-8'))
     ASSERT_DRV(err)
-
     return kernel
 
 
-def _cuda_transfer_mem(usage, func, source_args: List, dest_args: List, arg_infos: List[ArgInfo]):
-    for source_arg, dest_arg, arg_info in zip(source_args, dest_args, arg_infos):
-        if usage in arg_info.usage.value:
-            err, = func(dest_arg, source_arg, arg_info.total_byte_size)
-            ASSERT_DRV(err)
+def get_func_from_ptx(ptx, func_name):
+    # Load PTX as module data and retrieve function
+    return get_func_from_module(load_module_from_ptx(ptx), func_name)
 
 
-def transfer_mem_host_to_cuda(device_args: List, host_args: List[np.array], arg_infos: List[ArgInfo]):
-    _cuda_transfer_mem(
-        usage='input',
-        func=cuda.cuMemcpyHtoD,
-        source_args=[a.ctypes.data for a in host_args],
-        dest_args=device_args,
-        arg_infos=arg_infos
+def plan_transfers(arg_infos: List[ArgInfo], usage: str):
+    """Resolves the transfers of the arguments with the given usage ("input" or "output") once for
+    all the batches: returns the (argument index, byte size) of each transfer"""
+    return tuple(
+        (i, int(arg_info.total_byte_size)) for i, arg_info in enumerate(arg_infos) if usage in arg_info.usage.value
     )
 
 
-def transfer_mem_cuda_to_host(device_args: List, host_args: List[np.array], arg_infos: List[ArgInfo]):
-    _cuda_transfer_mem(
-        usage='output',
-        func=cuda.cuMemcpyDtoH,
-        source_args=device_args,
-        dest_args=[a.ctypes.data for a in host_args],
-        arg_infos=arg_infos
-    )
+def transfer_mem_host_to_cuda(device_args: List, host_args: List[np.array], transfers):
+    for i, byte_size in transfers:
+        err, = cuda.cuMemcpyHtoD(device_args[i], host_args[i].ctypes.data, byte_size)
+        ASSERT_DRV(err)
+
+
+def transfer_mem_cuda_to_host(device_args: List, host_args: List[np.array], transfers):
+    for i, byte_size in transfers:
+        err, = cuda.cuMemcpyDtoH(host_args[i].ctypes.data, device_args[i], byte_size)
+        ASSERT_DRV(err)
 
 
 def allocate_cuda_mem(arg_infos: List[ArgInfo]):
@@ -167,16 +186,38 @@ def free_cuda_mem(args):
         cuda.cuMemFree(arg)
 
 
-def device_args_to_ptr_list(device_args: List):
-    # CUDA python example says this is subject to change
-    ptrs = [np.array([int(d_arg)], dtype=np.uint64) for d_arg in device_args]
-    ptrs = np.array([ptr.ctypes.data for ptr in ptrs], dtype=np.uint64)
-
-    return ptrs
+def allocate_kernel_params(num_args: int):
+    """Allocates the kernel parameters of cuLaunchKernel once: returns the array of argument values
+    (the device pointers, to be updated in place) and the array of pointers to each of its slots"""
+    arg_values = np.zeros(num_args, dtype=np.uint64)
+    ptrs = np.uint64(arg_values.ctypes.data) + np.arange(num_args, dtype=np.uint64) * np.uint64(arg_values.itemsize)
+    return arg_values, ptrs
 
 
 _PTX_CACHE = {}
 
+# (device id, source path) -> module, the modules stay loaded in the primary contexts for the process
+_MODULE_CACHE = {}
+# (device id, source path, function name) -> kernel, a source can define the kernels of several functions
+_KERNEL_CACHE = {}
+
+
+def get_cuda_kernel(cuda_src_path: pathlib.Path, func_name, device_id):
+    """Returns the kernel of the function func_name, which is defined in the program at cuda_src_path.
+    The program is compiled once, and loaded once per device"""
+    kernel_key = (device_id, cuda_src_path, func_name)
+    kernel = _KERNEL_CACHE.get(kernel_key)
+    if kernel is None:
+        ptx_mod = _MODULE_CACHE.get((device_id, cuda_src_path))
+        if ptx_mod is None:
+            ptx = _PTX_CACHE.get(cuda_src_path)
+            if not ptx:
+                _PTX_CACHE[cuda_src_path] = ptx = compile_cuda_program(cuda_src_path, func_name, device_id)
+            _MODULE_CACHE[(device_id, cuda_src_path)] = ptx_mod = load_module_from_ptx(ptx)
+
+        _KERNEL_CACHE[kernel_key] = kernel = get_func_from_module(ptx_mod, func_name)
+    return kernel
+
 
 class CudaCallableFunc(CallableFunc):
 
@@ -186,7 +227,10 @@ class CudaCallableFunc(CallableFunc):
         self.func_info = FunctionInfo(func)
         self.kernel = None
         self.device_mem = None
+        self.arg_values = None
         self.ptrs = None
+        self.input_transfers = ()
+        self.output_transfers = ()
         self.start_event = None
         self.stop_event = None
         self.cuda_src_path = cuda_src_path
@@ -195,23 +239,24 @@ class CudaCallableFunc(CallableFunc):
     def init_runtime(self, benchmark: bool, device_id: int, working_dir: str):
         self.context = initialize_cuda(device_id)
 
-        ptx = _PTX_CACHE.get(self.cuda_src_path)
-        if not ptx:
-            _PTX_CACHE[self.cuda_src_path] = ptx = compile_cuda_program(self.cuda_src_path, self.func_info.name, device_id)
-
-        self.kernel = get_func_from_ptx(ptx, self.func_info.name)
+        # the module is loaded once per device, rather than on every call
+        self.kernel = get_cuda_kernel(self.cuda_src_path, self.func_info.name, device_id)
+        self.arg_values, self.ptrs = allocate_kernel_params(len(self.func_info.arguments))
+        self.input_transfers = plan_transfers(self.func_info.arguments, "input")
+        self.output_transfers = plan_transfers(self.func_info.arguments, "output")
 
     def cleanup_runtime(self, benchmark: bool, working_dir: str):
-        cuda.cuCtxDestroy(self.context)
+        # the primary context is shared across functions, so it is not destroyed here
+        pass
 
     def init_batch(self, benchmark: bool, warmup_iters=0, device_id: int = 0, args=[]):
         self.func_info.verify(args[0] if benchmark else args)
         self.device_mem = allocate_cuda_mem(self.func_info.arguments)
 
         if not benchmark:
-            transfer_mem_host_to_cuda(device_args=self.device_mem, host_args=args, arg_infos=self.func_info.arguments)
+            transfer_mem_host_to_cuda(device_args=self.device_mem, host_args=args, transfers=self.input_transfers)
 
-        self.ptrs = device_args_to_ptr_list(self.device_mem)
+        self.arg_values[:] = [int(d_arg) for d_arg in self.device_mem]
 
         if self.hat_func.dynamic_shared_mem_bytes > 0:
             err, = cuda.cuFuncSetAttribute(self.kernel, cuda.CUfunction_attribute.CU_FUNC_ATTRIBUTE_MAX_DYNAMIC_SHARED_SIZE_BYTES, self.hat_func.dynamic_shared_mem_bytes)
@@ -256,22 +301,20 @@ class CudaCallableFunc(CallableFunc):
         ASSERT_DRV(err)
         err, = cuda.cuEventSynchronize(self.stop_event)
         ASSERT_DRV(err)
+        # (the stop event completes after all the launches, so the stream is done too)
         err, batch_time_ms = cuda.cuEventElapsedTime(self.start_event, self.stop_event)
         ASSERT_DRV(err)
 
-        if not benchmark:
-            err, = cuda.cuCtxSynchronize()
-            ASSERT_DRV(err)
-
         return batch_time_ms
 
     def cleanup_batch(self, benchmark: bool, args=[]):
         # If there's no device mem, that means allocation during initialization failed, which means nothing else needs to be cleaned up either
         if not benchmark and self.device_mem:
-            transfer_mem_cuda_to_host(device_args=self.device_mem, host_args=args, arg_infos=self.func_info.arguments)
+            transfer_mem_cuda_to_host(device_args=self.device_mem, host_args=args, transfers=self.output_transfers)
         if self.device_mem:
             free_cuda_mem(self.device_mem)
-        err, = cuda.cuCtxSynchronize()
+        # the primary context is shared, so only the stream of the launches is synchronized
+        err, = cuda.cuStreamSynchronize(0)
         ASSERT_DRV(err)
 
         if self.start_event:
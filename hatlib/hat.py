@@ -25,6 +25,7 @@ For example:
     package.my_func_698b5e5c(A, B, D, E)
 """
 import numpy as np
+import operator
 
 from typing import Callable, List, Tuple, Union
 from functools import reduce
@@ -89,8 +90,9 @@ def generate_arg_sets_for_func(
     else:
         numerical_shapes = [p.shape if p.shape else ([int(p.size)] if p.size else [1]) for p in func.arguments]
 
-    shapes_to_sizes = [reduce(lambda x, y: x * y, shape, 1) for shape in numerical_shapes]
-    set_size = reduce(lambda x, y: x + y, map(lambda size, p: size * p.element_num_bytes, shapes_to_sizes, parameters))
+    # operator.mul and sum keep the arithmetic in C (math.prod would need Python 3.8)
+    shapes_to_sizes = [reduce(operator.mul, shape, 1) for shape in numerical_shapes]
+    set_size = sum(size * p.element_num_bytes for size, p in zip(shapes_to_sizes, parameters))
     num_input_sets = (input_sets_minimum_size_MB * 1024 * 1024 // set_size) + 1 + num_additional
 
     arg_sets = [generate_arg_values(parameters, dim_names_to_values) for _ in range(num_input_sets)]
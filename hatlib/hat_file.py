@@ -2,6 +2,7 @@
 
 # Utility to parse the TOML metadata from HAT files
 import os
+import sys
 import tomlkit
 from dataclasses import dataclass, field
 from enum import Enum
@@ -10,6 +11,10 @@ from typing import Dict, List
 
 # TODO : type-checking on leaf node values
 
+# Slotted dataclasses (Python 3.10+) drop the per-instance __dict__ for the
+# descriptions that are created in bulk, e.g. one per function and argument
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
 
 def _read_toml_file(filepath):
     path = os.path.abspath(filepath)
@@ -71,7 +76,7 @@ class OperatingSystem(Enum):
         return OperatingSystem(platform_name)
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class AuxiliarySupportedTable:
     AuxiliaryKey = "auxiliary"
     auxiliary: dict = field(default_factory=dict)
@@ -117,7 +122,7 @@ class Description(AuxiliarySupportedTable):
         )
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class Parameter:
     # All parameter keys
     name: str = ""
@@ -198,7 +203,7 @@ class Parameter:
             usage=UsageType.Output
         )
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class Function(AuxiliarySupportedTable):
     # required
     arguments: List[Parameter] = field(default_factory=list)
@@ -311,13 +316,13 @@ class DeviceFunctionTable(FunctionTableCommon):
     TableName = "device_functions"
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class Target:
 
     @dataclass
     class Required:
 
-        @dataclass
+        @dataclass(**_DATACLASS_SLOTS)
         class CPU:
             TableName = TargetType.CPU.value
 
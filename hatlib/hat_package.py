@@ -2,12 +2,18 @@
 
 import ctypes
 from collections import OrderedDict
+import functools
+import importlib.util
 import os
+import pathlib
+import sys
 from typing import List
 
 from .hat_file import HATFile, Function
 from .function_info import FunctionInfo
 
+_SUPPORTED_LIB_EXTENSIONS = frozenset({".dll", ".so", ".dylib"})
+
 
 class HATPackage:
 
@@ -28,6 +34,9 @@ class HATPackage:
 
         self.functions = self.hat_file.functions
 
+        # results of get_functions_for_target, keyed by (os, arch, required_extensions)
+        self._functions_for_target = {}
+
     def __iter__(self):
         return iter(self.hat_file.functions)
 
@@ -35,18 +44,17 @@ class HATPackage:
         return self.hat_file.functions
 
     def get_functions_for_target(self, os: str, arch: str, required_extensions: list = []) -> List[Function]:
-        all_functions = self.get_functions()
-
-        def matches_target(hat_function):
-            hat_file = hat_function.hat_file
-            if hat_file.target.required.os != os or hat_file.target.required.cpu.architecture != arch:
-                return False
-            for required_ext in required_extensions:
-                if required_ext not in hat_file.target.required.cpu.extensions:
-                    return False
-            return True
-
-        return list(filter(matches_target, all_functions))
+        required_extensions = frozenset(required_extensions)
+        query = (os, arch, required_extensions)
+        functions = self._functions_for_target.get(query)
+        if functions is None:
+            functions = [
+                f for f in self.get_functions()
+                if f.hat_file.target.required.os == os and f.hat_file.target.required.cpu.architecture == arch
+                and required_extensions.issubset(f.hat_file.target.required.cpu.extensions)
+            ]
+            self._functions_for_target[query] = functions
+        return list(functions)
 
     def get_function(self, name: str) -> Function:
         for f in self.get_functions():
@@ -102,11 +110,13 @@ def _make_unprofiled_cpu_func(shared_lib: ctypes.CDLL, func: Function):
     func_info = FunctionInfo(func)
     fn = shared_lib[func_info.name]
 
-    def f(*args):
+    def f(*args, verify: bool = True):
         args_ = func_info.preprocess(args)
 
         # verify that the args match the description in the hat file
-        func_info.verify(args_)
+        # (callers that have already verified these args, such as the benchmark loop, can skip this)
+        if verify:
+            func_info.verify(args_)
 
         # prepare the args to the hat package
         hat_args = func_info.as_cargs(args_)
@@ -132,48 +142,57 @@ def _make_callable_func(func_runtime: str, hat_dir_path: str, func: Function):
         return host_loader.create_loader_for_host_function(func, hat_dir_path)
 
 
-def _load_pkg_binary_module(hat_pkg: HATPackage):
-    shared_lib = None
-    if os.path.isfile(hat_pkg.link_target_path):
-        supported_extensions = [".dll", ".so", ".dylib"]
-        _, extension = os.path.splitext(hat_pkg.link_target_path)
+@functools.lru_cache(maxsize=None)
+def _load_cdll(hat_binary_path: str) -> ctypes.CDLL:
+    # HAT packages that share a link target also share the CDLL and its resolved symbols
+    return ctypes.cdll.LoadLibrary(hat_binary_path)
 
-        if extension and extension in supported_extensions:
-            hat_binary_path = os.path.abspath(hat_pkg.link_target_path)
 
-            # load the hat_library:
-            hat_library = ctypes.cdll.LoadLibrary(hat_binary_path) if extension else None
-            shared_lib = hat_library
+def _load_pkg_binary_module(hat_pkg: HATPackage):
+    # check that the HAT library has a supported file extension
+    _, extension = os.path.splitext(hat_pkg.link_target_path)
+    if extension.lower() not in _SUPPORTED_LIB_EXTENSIONS:
+        return None
 
-    return shared_lib
+    try:
+        hat_binary_path = os.fspath(pathlib.Path(hat_pkg.link_target_path).resolve(strict=True))
+    except FileNotFoundError:
+        return None
 
+    # load the hat_library:
+    return _load_cdll(hat_binary_path)
 
-def hat_package_to_func_dict(hat_pkg: HATPackage, enable_native_profiling: bool) -> AttributeDict:
-    try:
+
+@functools.lru_cache(maxsize=None)
+def _device_runtime_available(func_runtime: str) -> bool:
+    """Checks whether the loader for a device runtime can be used on this machine.
+    Only called for runtimes that a package actually uses, and cached for the process."""
+    if func_runtime == "CUDA":
+        # the CUDA loader requires the cuda-python package, which can be detected without importing it
+        if importlib.util.find_spec("cuda") is None:
+            return False
         try:
             from . import cuda_loader
-        except ModuleNotFoundError:
-            import cuda_loader
-    except:
-        CUDA_AVAILABLE = False
-    else:
-        CUDA_AVAILABLE = True
-
-    try:
+        except Exception:
+            return False
+    elif func_runtime == "ROCM":
+        # the ROCm loader is only supported on linux
+        if not sys.platform.startswith("linux"):
+            return False
         try:
             from . import rocm_loader
-        except ModuleNotFoundError:
-            import rocm_loader
-    except:
-        ROCM_AVAILABLE = False
-    else:
-        ROCM_AVAILABLE = True
+        except Exception:    # e.g. libamdhip64.so is not installed
+            return False
+    return True
+
 
-    NOTIFY_ABOUT_CUDA = not CUDA_AVAILABLE
-    NOTIFY_ABOUT_ROCM = not ROCM_AVAILABLE
+def hat_package_to_func_dict(hat_pkg: HATPackage, enable_native_profiling: bool) -> AttributeDict:
+    NOTIFY_ABOUT_CUDA = True
+    NOTIFY_ABOUT_ROCM = True
 
     # check that the HAT library has a supported file extension
     func_dict = AttributeDict()
+    rocm_funcs = []
     shared_lib = _load_pkg_binary_module(hat_pkg)
     hat_dir_path, _ = os.path.split(hat_pkg.hat_file_path)
 
@@ -190,7 +209,7 @@ def hat_package_to_func_dict(hat_pkg: HATPackage, enable_native_profiling: bool)
                     raise RuntimeError(f"Couldn't find runtime for loader: " + launches)
 
                 # TODO: Generalize this concept to work so it's not CUDA/ROCM specific
-                if func_runtime == "CUDA" and not CUDA_AVAILABLE:
+                if func_runtime == "CUDA" and not _device_runtime_available(func_runtime):
 
                     # TODO: printing to stdout only makes sense in tool mode
                     if NOTIFY_ABOUT_CUDA:
@@ -199,7 +218,7 @@ def hat_package_to_func_dict(hat_pkg: HATPackage, enable_native_profiling: bool)
 
                     continue
 
-                elif func_runtime == "ROCM" and not ROCM_AVAILABLE:
+                elif func_runtime == "ROCM" and not _device_runtime_available(func_runtime):
 
                     # TODO: printing to stdout only makes sense in tool mode
                     if NOTIFY_ABOUT_ROCM:
@@ -213,5 +232,12 @@ def hat_package_to_func_dict(hat_pkg: HATPackage, enable_native_profiling: bool)
             func_dict[func_name] = _make_callable_func(
                 func_runtime=func_runtime, hat_dir_path=hat_dir_path, func=device_func
             )
+            if func_runtime == "ROCM":
+                rocm_funcs.append(func_dict[func_name])
+
+    if rocm_funcs:
+        # optionally compile the ROCm programs in the background, ahead of the first calls
+        from . import rocm_loader
+        rocm_loader.start_rocm_warmup(rocm_funcs)
 
     return func_dict
@@ -20,14 +20,58 @@ Dependencies on Linux / macOS:
 import sys
 import os
 import argparse
+import hashlib
 import shutil
-from secrets import token_hex
 
 from .hat_file import HATFile, OperatingSystem
 from .hat_package import HATPackage
 from .platform_utilities import get_platform, ensure_compiler_in_path, run_command
 
 
+# the flags of the commands that build the dynamic HAT binary (which are part of its hash)
+_GCC_COMPILE_FLAGS = ["-c", "-w", "-fPIC"]
+_GCC_LINK_FLAGS = ["-shared", "-fPIC"]
+_CL_COMPILE_FLAGS = ["/nologo", "/c"]
+_LINK_FLAGS = ["/NOLOGO", "/DLL", "/FORCE:MULTIPLE"]
+
+
+def _hash_file(h, path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+
+def _hash_package_inputs(input_hat_path, input_hat_binary_path, hat_file, flags):
+    """Returns a short hash of everything the dynamic HAT binary is built from: the package,
+    the contents of its dynamic dependencies and the build flags"""
+    h = hashlib.blake2b(digest_size=4)
+    for path in [input_hat_path, input_hat_binary_path]:
+        _hash_file(h, path)
+    for d in hat_file.dependencies.dynamic:
+        h.update(d.target_file.encode("utf-8"))
+        # (a dependency that is not a file, e.g. one found by the linker, is only known by its name)
+        if os.path.isfile(d.target_file):
+            _hash_file(h, d.target_file)
+    for flag in flags:
+        h.update(flag.encode("utf-8") + b"\0")
+    return h.hexdigest()
+
+
+def _replace_output(build_output, output_path):
+    """Builds an output through a temporary file next to it, which replaces the output once it is
+    complete, so that an interrupted build never leaves a partial output that would be reused.
+    `build_output` writes the file at the path it is given"""
+    # (named after the process rather than created by mkstemp, which would make the output owner-only)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        build_output(temp_path)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
 def linux_create_dynamic_package(input_hat_path,
                                  input_hat_binary_path,
                                  output_hat_path,
@@ -41,27 +85,33 @@ def linux_create_dynamic_package(input_hat_path,
             f"ERROR: Expected input library to have extension .o or .a, but received {input_hat_binary_path} instead"
         )
 
-    # Create a C source file to resolve inline functions defined in the static HAT package
-    include_path = os.path.dirname(input_hat_binary_path)
-    inline_c_path = os.path.join(include_path, "inline.c")
-    inline_obj_path = os.path.join(include_path, "inline.o")
-    with open(inline_c_path, "w") as f:
-        f.write(f"#include <{os.path.basename(input_hat_path)}>")
-    # compile it separately so that we can suppress the warnings about the missing terminating ' character
-    run_command(
-        f'gcc -c -w -fPIC -o "{inline_obj_path}" -I"{include_path}" "{inline_c_path}"',
-        quiet=quiet)
-
-    # create new HAT binary
+    # name the so file after its inputs: a changed package never reuses a name that
+    # may already be loaded, and an unchanged package reuses the existing binary
     prefix, _ = os.path.splitext(output_hat_path)
-    # always create a new so file (avoids cases where so file is already loaded)
-    suffix = token_hex(4)
+    suffix = _hash_package_inputs(
+        input_hat_path, input_hat_binary_path, hat_file, _GCC_COMPILE_FLAGS + _GCC_LINK_FLAGS
+    )
     output_hat_binary_path = f"{prefix}_{suffix}.so"
-    libraries = " ".join(
-        [d.target_file for d in hat_file.dependencies.dynamic])
-    run_command(
-        f'gcc -shared -fPIC -o "{output_hat_binary_path}" "{inline_obj_path}" "{input_hat_binary_path}" {libraries}',
-        quiet=quiet)
+
+    if not os.path.exists(output_hat_binary_path):
+        # Create a C source file to resolve inline functions defined in the static HAT package
+        include_path = os.path.dirname(input_hat_binary_path)
+        inline_c_path = os.path.join(include_path, "inline.c")
+        inline_obj_path = os.path.join(include_path, "inline.o")
+        with open(inline_c_path, "w") as f:
+            f.write(f"#include <{os.path.basename(input_hat_path)}>")
+        # compile it separately so that we can suppress the warnings about the missing terminating ' character
+        run_command(
+            ["gcc"] + _GCC_COMPILE_FLAGS + ["-o", inline_obj_path, f"-I{include_path}", inline_c_path],
+            quiet=quiet)
+
+        # create new HAT binary
+        libraries = [d.target_file for d in hat_file.dependencies.dynamic]
+        _replace_output(
+            lambda path: run_command(
+                ["gcc"] + _GCC_LINK_FLAGS + ["-o", path, inline_obj_path, input_hat_binary_path] + libraries,
+                quiet=quiet),
+            output_hat_binary_path)
 
     # create new HAT file
     # previous dependencies are now part of the binary
@@ -95,33 +145,38 @@ def windows_create_dynamic_package(input_hat_path,
     try:
         os.chdir("build")
 
-        # Create a C source file for the DLL entry point and compile in into an obj
-        with open("dllmain.cpp", "w") as f:
-            f.write("#include <windows.h>\n")
-            # Resolve inline functions defined in the static HAT package
-            f.write("#include <{}>\n".format(os.path.basename(input_hat_path)))
-            f.write(
-                "BOOL APIENTRY DllMain(HMODULE, DWORD, LPVOID) { return TRUE; }\n"
-            )
-        run_command(
-            f'cl.exe /nologo /I"{os.path.dirname(input_hat_path)}" /Fodllmain.obj /c dllmain.cpp',
-            quiet=quiet)
-
-        # create the new HAT binary dll
-        # always create a new dll (avoids case where dll is already loaded)
-        suffix = token_hex(4)
+        # name the dll after its inputs: a changed package never reuses a name that
+        # may already be loaded, and an unchanged package reuses the existing binary
+        suffix = _hash_package_inputs(
+            input_hat_path, input_hat_binary_path, hat_file, _CL_COMPILE_FLAGS + _LINK_FLAGS
+        )
         prefix, _ = os.path.splitext(output_hat_path)
         output_hat_binary_path = f"{prefix}_{suffix}.dll"
 
-        function_descriptions = hat_file.functions
-        function_names = [f.name for f in function_descriptions]
-        exports = " /EXPORT:".join(function_names)
-
-        libraries = " ".join(
-            [d.target_file for d in hat_file.dependencies.dynamic])
-        linker_command_line = f'link.exe /NOLOGO /DLL /FORCE:MULTIPLE /EXPORT:{exports} /OUT:out.dll dllmain.obj "{input_hat_binary_path}" {libraries}'
-        run_command(linker_command_line, quiet=quiet)
-        shutil.copyfile("out.dll", output_hat_binary_path)
+        if not os.path.exists(output_hat_binary_path):
+            # Create a C source file for the DLL entry point and compile in into an obj
+            with open("dllmain.cpp", "w") as f:
+                f.write("#include <windows.h>\n")
+                # Resolve inline functions defined in the static HAT package
+                f.write("#include <{}>\n".format(os.path.basename(input_hat_path)))
+                f.write(
+                    "BOOL APIENTRY DllMain(HMODULE, DWORD, LPVOID) { return TRUE; }\n"
+                )
+            run_command(
+                ["cl.exe"] + _CL_COMPILE_FLAGS +
+                [f"/I{os.path.dirname(input_hat_path)}", "/Fodllmain.obj", "dllmain.cpp"],
+                quiet=quiet)
+
+            # create the new HAT binary dll
+            function_descriptions = hat_file.functions
+            function_names = [f.name for f in function_descriptions]
+            exports = [f"/EXPORT:{function_name}" for function_name in function_names]
+
+            libraries = [d.target_file for d in hat_file.dependencies.dynamic]
+            linker_command_line = ["link.exe"] + _LINK_FLAGS + exports + \
+                ["/OUT:out.dll", "dllmain.obj", input_hat_binary_path] + libraries
+            run_command(linker_command_line, quiet=quiet)
+            _replace_output(lambda path: shutil.copyfile("out.dll", path), output_hat_binary_path)
 
         # create new HAT file
         # previous dependencies are now part of the binary
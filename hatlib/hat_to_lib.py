@@ -22,13 +22,16 @@ import sys
 import os
 import argparse
 import shutil
+import subprocess
 
 from .hat_file import HATFile, OperatingSystem
 from .platform_utilities import get_platform, ensure_compiler_in_path, run_command
 
 
-def linux_create_static_package(input_hat_binary_path, output_hat_path, hat_file, quiet=True):
-    """Creates a static HAT (.a) from a static HAT (.o) on a Linux/macOS platform"""
+def linux_create_static_package(input_hat_binary_path, output_hat_path, hat_file, quiet=True, thin=False):
+    """Creates a static HAT (.a) from a static HAT (.o) on a Linux/macOS platform.
+    A thin archive only references the input object files instead of copying them, so it
+    is faster to create but is only usable while the inputs stay in place."""
     # Confirm that this is a static .o hat library
     _, extension = os.path.splitext(input_hat_binary_path)
     if extension != ".o":
@@ -37,8 +40,26 @@ def linux_create_static_package(input_hat_binary_path, output_hat_path, hat_file
     # create new HAT binary
     prefix, _ = os.path.splitext(output_hat_path)
     output_hat_binary_path = f"{prefix}.a"
-    libraries = " ".join([d.target_file for d in hat_file.dependencies.dynamic])
-    run_command(f'ar rcs "{output_hat_binary_path}" "{input_hat_binary_path}" {libraries}', quiet=quiet)
+    libraries = [d.target_file for d in hat_file.dependencies.dynamic]
+
+    # quick-append the members into a fresh archive (no per-member duplicate scan),
+    # then build the symbol index once for the whole archive
+    if os.path.exists(output_hat_binary_path):
+        os.remove(output_hat_binary_path)
+    if thin:
+        try:
+            # (thin archives are a GNU ar extension: the BSD and macOS ar read the T modifier as "truncate
+            # member names" and silently create a full archive, while they reject --thin, as does a GNU ar
+            # older than binutils 2.36, so these fall back to a full archive below)
+            run_command(["ar", "qcS", "--thin", output_hat_binary_path, input_hat_binary_path] + libraries,
+                        quiet=quiet)
+        except subprocess.CalledProcessError:
+            if os.path.exists(output_hat_binary_path):
+                os.remove(output_hat_binary_path)
+            thin = False
+    if not thin:
+        run_command(["ar", "qcS", output_hat_binary_path, input_hat_binary_path] + libraries, quiet=quiet)
+    run_command(["ranlib", output_hat_binary_path], quiet=quiet)
 
     # create new HAT file
     hat_file.dependencies.dynamic = [] # previous dependencies are now part of the binary
@@ -54,31 +75,20 @@ def windows_create_static_package(input_hat_binary_path, output_hat_path, hat_fi
     if extension != ".obj":
         sys.exit(f"ERROR: Expected input library to have extension .obj, but received {input_hat_binary_path} instead")
 
-    # Create all file in a directory named build
-    if not os.path.exists("build"):
-        os.mkdir("build")
-
-    cwd = os.getcwd()
-    try:
-        os.chdir("build")
+    # create the new HAT binary lib
+    prefix, _ = os.path.splitext(output_hat_path)
+    output_hat_binary_path = f"{prefix}.lib"
 
-        # create the new HAT binary lib
-        prefix, _ = os.path.splitext(output_hat_path)
-        output_hat_binary_path = f"{prefix}.lib"
+    # presume /DEF is not needed because the exports will be part of the HAT file
+    libraries = [d.target_file for d in hat_file.dependencies.dynamic]
+    archiver_command_line = ["lib.exe", "/NOLOGO", f"/OUT:{output_hat_binary_path}", input_hat_binary_path] + libraries
+    run_command(archiver_command_line, quiet=quiet)
 
-        # presume /DEF is not needed because the exports will be part of the HAT file
-        libraries = " ".join([d.target_file for d in hat_file.dependencies.dynamic])
-        archiver_command_line = f'lib.exe /NOLOGO /OUT:out.lib "{input_hat_binary_path}" {libraries}'
-        run_command(archiver_command_line, quiet=quiet)
-        shutil.copyfile("out.lib", output_hat_binary_path)
+    # create new HAT file
+    hat_file.dependencies.dynamic = [] # previous dependencies are now part of the binary
+    hat_file.dependencies.link_target = os.path.basename(output_hat_binary_path)
+    hat_file.Serialize(output_hat_path)
 
-        # create new HAT file
-        hat_file.dependencies.dynamic = [] # previous dependencies are now part of the binary
-        hat_file.dependencies.link_target = os.path.basename(output_hat_binary_path)
-        hat_file.Serialize("out.hat")
-        shutil.copyfile("out.hat", output_hat_path)
-    finally:
-        os.chdir(cwd) # restore the current working directory
 
 def parse_args():
     """Parses and checks the command line arguments"""
@@ -89,6 +99,7 @@ def parse_args():
     parser.add_argument("input_hat_path", type=str, help="Path to the existing HAT file, which represents a statically-linked HAT package with a .obj or .o binary file")
     parser.add_argument("output_hat_path", type=str, help="Path to the new HAT file, which will represent a statically-linked HAT package with a .lib or .a binary file")
     parser.add_argument('-v', "--verbose", action='store_true', help="Enable verbose output")
+    parser.add_argument("--thin", action='store_true', help="Create a thin archive that references the input .o instead of copying it (Linux only)")
     args = parser.parse_args()
 
     # check args
@@ -109,9 +120,22 @@ def parse_args():
     return args
 
 
-def create_static_package(input_hat_path, output_hat_path, quiet=True):
+def copy_static_package(input_hat_binary_path, output_hat_path, hat_file):
+    """Creates a static HAT package from a static HAT package that already has an archive
+    (.a/.lib) binary and no dynamic dependencies, so there is nothing to repack"""
+    prefix, _ = os.path.splitext(output_hat_path)
+    _, extension = os.path.splitext(input_hat_binary_path)
+    output_hat_binary_path = f"{prefix}{extension}"
+    if os.path.abspath(output_hat_binary_path) != os.path.abspath(input_hat_binary_path):
+        shutil.copyfile(input_hat_binary_path, output_hat_binary_path)
+
+    # create new HAT file
+    hat_file.dependencies.link_target = os.path.basename(output_hat_binary_path)
+    hat_file.Serialize(output_hat_path)
+
+
+def create_static_package(input_hat_path, output_hat_path, quiet=True, thin=False):
     platform = get_platform()
-    ensure_compiler_in_path()
 
     # load the function decscriptions and the library path from the hat file
     input_hat_path = os.path.abspath(input_hat_path)
@@ -121,18 +145,27 @@ def create_static_package(input_hat_path, output_hat_path, quiet=True):
     input_hat_binary_filename = hat_file.dependencies.link_target
     input_hat_binary_path = os.path.join(os.path.dirname(input_hat_path), input_hat_binary_filename)
 
+    # fast path: the binary already is an archive in the platform's format
+    _, extension = os.path.splitext(input_hat_binary_filename)
+    archive_extension = ".lib" if platform == OperatingSystem.Windows else ".a"
+    if extension == archive_extension and not hat_file.dependencies.dynamic:
+        copy_static_package(input_hat_binary_path, os.path.abspath(output_hat_path), hat_file)
+        return
+
+    ensure_compiler_in_path()
+
     # create the static library package
     # TODO: prefer lld when available and support cross-compilation
     output_hat_path = os.path.abspath(output_hat_path)
     if platform == OperatingSystem.Windows:
         windows_create_static_package(input_hat_binary_path, output_hat_path, hat_file, quiet=quiet)
     elif platform in [OperatingSystem.Linux, OperatingSystem.MacOS]:
-        linux_create_static_package(input_hat_binary_path, output_hat_path, hat_file, quiet=quiet)
+        linux_create_static_package(input_hat_binary_path, output_hat_path, hat_file, quiet=quiet, thin=thin)
 
 
 def main():
     args = parse_args()
-    create_static_package(args.input_hat_path, args.output_hat_path, quiet=not args.verbose)
+    create_static_package(args.input_hat_path, args.output_hat_path, quiet=not args.verbose, thin=args.thin)
 
 
 if __name__ == "__main__":
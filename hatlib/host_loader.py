@@ -1,16 +1,17 @@
 import os
 import numpy as np
+from string import Template
 from .callable_func import CallableFunc
 from .hat_file import Function, HATFile, Declaration, Dependencies, CallingConventionType, Parameter, ParameterType, OperatingSystem, UsageType
 from .hat import load
 from .function_info import FunctionInfo
 from .arg_info import ArgInfo
 from .arg_value import generate_arg_values
-from .platform_utilities import generate_and_run_cmake_file, get_platform
+from .platform_utilities import BuildSession, get_platform
 
-profiler_code = """
+profiler_code = Template("""
 #undef TOML
-#include "{src_include}"
+#include "$src_include"
 #include <chrono>
 #include <cstdio>
 
@@ -20,15 +21,15 @@ profiler_code = """
 #define DLL_EXPORT extern "C"
 #endif
 
-DLL_EXPORT void timer({intput_args_decl}, double* timing)
+DLL_EXPORT void timer($intput_args_decl, double* timing)
 {
     auto start = std::chrono::high_resolution_clock::now();
-    {func_to_profile}
+    $func_to_profile
     auto end = std::chrono::high_resolution_clock::now();
     std::chrono::duration<double, std::milli> elapsed_ms = end - start;
     *timing += elapsed_ms.count(); 
 }
-"""
+""")
 
 class HostCallableFunc(CallableFunc):
     def __init__(self, func: Function, host_src_path: str) -> None:
@@ -37,36 +38,62 @@ class HostCallableFunc(CallableFunc):
         self.hat_func = func
         self.func_info = FunctionInfo(func)
 
-    def init_runtime(self, benchmark: bool, device_id: int, working_dir: str):
+        # a BuildSession shared with other functions (e.g. by the benchmark), otherwise
+        # each call to init_runtime (or prepare_sources) builds the timer in a session of its own
+        self.build_session: BuildSession = None
+        self._owned_build_session: BuildSession = None
+        self._sources_prepared = False
+
+    def prepare_sources(self, dest_dir: str, benchmark: bool = True):
+        """Writes the timer code and adds it to the build session without building it, so that
+        the timers of several functions can be built together by `BuildSession.build_pending`"""
         # create the timer code
         src_dir = os.path.dirname(__file__)
-        dest_dir = working_dir or os.getcwd()
         native_profiler_name = self.func_info.name + "_timer"
         native_profiler_prefix = os.path.join(dest_dir, native_profiler_name)
         self.native_profiler_srcfile = native_profiler_prefix + ".cpp"
         self.native_profiler_hatfile = native_profiler_prefix + ".hat"
         with open(self.native_profiler_srcfile, "w") as timer_file:
-            timer_file.write(profiler_code
-                .replace("{src_include}", self.hat_func.hat_file.name + ".hat")
-                .replace("{intput_args_decl}", self.func_info.as_arg_type_decl())
-                .replace("{func_to_profile}", f"{self.func_info.name}({self.func_info.as_arg_names()});"))
-
-        # Build the timer code
+            timer_file.write(
+                profiler_code.substitute(
+                    src_include=self.hat_func.hat_file.name + ".hat",
+                    intput_args_decl=self.func_info.as_arg_type_decl(),
+                    func_to_profile=f"{self.func_info.name}({self.func_info.as_arg_names()});"
+                )
+            )
+
+        # Add the timer code to the build
         static_lib = self.hat_func.hat_file.dependencies.auxiliary["static"]
 
-        target_binaries = generate_and_run_cmake_file(
+        build_session = self.build_session
+        if build_session is None:
+            build_session = self._owned_build_session = BuildSession(
+                dest_dir=dest_dir,
+                #build_type="Debug",
+                profile=benchmark
+            )
+
+        target_binaries = build_session.add(
             target_name=native_profiler_name,
             src_dir=src_dir,
-            dest_dir=dest_dir,
-            #build_type="Debug",
             additional_include_filepaths=[self.host_src_path],
             additional_link_filepaths=[os.path.join(os.path.dirname(self.hat_func.hat_file.path), static_lib)],
-            additional_src_filepaths=[self.native_profiler_srcfile],
-            profile=benchmark
+            additional_src_filepaths=[self.native_profiler_srcfile]
         )
-
         assert len(target_binaries.items()) == 1
         _, self.target = list(target_binaries.items())[0]
+        self._sources_prepared = True
+
+    def init_runtime(self, benchmark: bool, device_id: int, working_dir: str):
+        dest_dir = working_dir or os.getcwd()
+        if not self._sources_prepared:
+            self.prepare_sources(dest_dir, benchmark)
+        self._sources_prepared = False
+
+        # Build the timer code (a no-op if it was already built with the other pending timers)
+        (self.build_session or self._owned_build_session).build_pending()
+
+        native_profiler_prefix, _ = os.path.splitext(self.native_profiler_hatfile)
         timer_header_code = f"void timer({self.func_info.as_arg_type_decl()}, double*);"
         timing_param = Parameter(
                                 logical_type=ParameterType.Element,
@@ -76,6 +103,8 @@ class HostCallableFunc(CallableFunc):
                                 )
         timing_arg_info = ArgInfo(timing_param)
         self.timing_arg_val = generate_arg_values([timing_arg_info])[0]
+        # the accumulator is allocated once and reset in place for every batch
+        self.timing_arg_val.value = np.zeros((1,), dtype=np.float64)
         timer_hat_file = HATFile(name=native_profiler_prefix,
                                     functions=[Function(
                                         arguments=self.hat_func.arguments + [timing_param],
@@ -94,15 +123,19 @@ class HostCallableFunc(CallableFunc):
 
     def cleanup_runtime(self, benchmark: bool, working_dir: str):
         working_dir = working_dir or os.getcwd()
+        # a shared session keeps building the other targets, which must no longer include this one
+        if self.build_session:
+            self.build_session.remove(self.func_info.name + "_timer")
+
         if self.native_profiler_srcfile and os.path.exists(self.native_profiler_srcfile):
             os.remove(self.native_profiler_srcfile)
 
         if self.native_profiler_hatfile and os.path.exists(self.native_profiler_hatfile):
             os.remove(self.native_profiler_hatfile)
 
-        cmake_file = os.path.join(working_dir, 'CMakeLists.txt')
-        if os.path.exists(cmake_file):
-            os.remove(cmake_file)
+        if self._owned_build_session:
+            self._owned_build_session.close()
+            self._owned_build_session = None
 
         if self.target and get_platform() != OperatingSystem.Windows: # Windows won't let you remove the dll until the process is dead
             target_file = os.path.join(working_dir, self.target)
@@ -113,22 +146,31 @@ class HostCallableFunc(CallableFunc):
     def init_batch(self, benchmark: bool, warmup_iters=0, device_id: int = 0, args=[]):
         self.func_info.verify(args[0] if benchmark else args)
 
+        timer_func = self.timer_func
+        timing_arg_val = self.timing_arg_val
         for _ in range(warmup_iters):
             if benchmark:
                 for arg in args:
-                    self.timer_func(*arg, self.timing_arg_val)
+                    timer_func(*arg, timing_arg_val)
             else:
-                self.timer_func(*args, self.timing_arg_val)
+                timer_func(*args, timing_arg_val)
 
     def run_batch(self, benchmark: bool, iters, args=[]) -> float:
-        i_max = len(args) if benchmark else 1
-        self.timing_arg_val.value = np.zeros((1,))
-
-        for iter in range(iters):
-            func_args = args[iter % i_max] if benchmark else args
-            self.timer_func(*func_args, self.timing_arg_val)
-
-        return float(self.timing_arg_val.value)
+        # bind everything the loop needs to locals, the loop body should only be the call
+        timer_func = self.timer_func
+        timing_arg_val = self.timing_arg_val
+        timing_arg_val.value.fill(0.0)
+
+        if benchmark:
+            i_max = len(args)
+            for iter in range(iters):
+                timer_func(*args[iter % i_max], timing_arg_val)
+        else:
+            func_args = tuple(args)
+            for _ in range(iters):
+                timer_func(*func_args, timing_arg_val)
+
+        return float(timing_arg_val.value)
 
     def cleanup_batch(self, benchmark: bool, args=[]):
         pass
@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 
+import functools
 import io
 import os
 import platform
+import re
 import shlex
 import shutil
 import subprocess
 import sys
+import tempfile
+import threading
+from collections import deque
 from typing import Mapping
 import enum
 
@@ -25,11 +30,20 @@ class BUILD_TYPE(enum.Enum):
     MIN_SIZE_REL = "MinSizeRel"
 
 
+_BUILD_SESSION_DIRNAME = "hat_build_session"
+
+
+@functools.lru_cache(maxsize=256)
+def _split_command(command_to_run):
+    return tuple(shlex.split(command_to_run))
+
+
 def _preprocess_command(command_to_run, shell):
+    # NOTE: internal callers pass argument lists, so shlex is only needed for commands given as strings
     if get_platform() == OperatingSystem.Windows:
         return command_to_run
     elif type(command_to_run) == str and not shell:
-        return shlex.split(command_to_run)
+        return list(_split_command(command_to_run))
     elif type(command_to_run) == list and shell:
         return subprocess.list2cmdline(command_to_run)
     else:
@@ -43,6 +57,38 @@ def _dump_file_contents(iostream):
             print(f.read())
 
 
+# number of trailing output lines kept per stream when a quiet command is run
+_OUTPUT_TAIL_LINES = 200
+
+
+def _drain_to_tail(stream, tail):
+    for line in stream:
+        tail.append(line)
+
+
+def _dump_output_tail(tail):
+    if tail:
+        print(b"".join(tail).decode(errors="replace"))
+
+
+def _run_and_capture_tails(command_to_run, **kwargs):
+    # drain both pipes concurrently (so a chatty compiler never blocks on a full pipe)
+    # while keeping only the tail of each one, which is what matters to diagnose a failure
+    tails = (deque(maxlen=_OUTPUT_TAIL_LINES), deque(maxlen=_OUTPUT_TAIL_LINES))
+    with subprocess.Popen(command_to_run, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs) as proc:
+        readers = [
+            threading.Thread(target=_drain_to_tail, args=(stream, tail), daemon=True)
+            for stream, tail in zip((proc.stdout, proc.stderr), tails)
+        ]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        proc.wait()
+
+    return proc.returncode, tails
+
+
 def run_command(
     command_to_run, working_directory=None, stdout=None, stderr=None, shell=False, pretend=False, quiet=True
 ):
@@ -51,21 +97,34 @@ def run_command(
 
     if not quiet:
         print(f"\ncd {working_directory}")
-        print(f"{command_to_run}\n")
+        print(f"{subprocess.list2cmdline(command_to_run) if type(command_to_run) == list else command_to_run}\n")
 
     command_to_run = _preprocess_command(command_to_run, shell)
 
     if not pretend:
-        with subprocess.Popen(command_to_run, close_fds=(get_platform() != OperatingSystem.Windows), shell=shell, stdout=stdout,
-                              stderr=stderr, cwd=working_directory) as proc:
-
-            proc.wait()
-            if proc.returncode:
+        close_fds = get_platform() != OperatingSystem.Windows
+        if quiet and stdout is None and stderr is None:
+            # the output is only shown if the command fails
+            returncode, (stdout_tail, stderr_tail) = _run_and_capture_tails(
+                command_to_run, close_fds=close_fds, shell=shell, cwd=working_directory
+            )
+            if returncode:
+                _dump_output_tail(stderr_tail)
+                _dump_output_tail(stdout_tail)
+                raise subprocess.CalledProcessError(
+                    returncode, command_to_run, b"".join(stdout_tail), b"".join(stderr_tail)
+                )
+        else:
+            result = subprocess.run(
+                command_to_run, close_fds=close_fds, shell=shell, stdout=stdout, stderr=stderr, cwd=working_directory
+            )
+            if result.returncode:
                 _dump_file_contents(stderr)
                 _dump_file_contents(stdout)
-                raise subprocess.CalledProcessError(proc.returncode, command_to_run)
+                raise subprocess.CalledProcessError(result.returncode, command_to_run)
 
 
+@functools.lru_cache(maxsize=None)
 def get_platform():
     """Returns the current platform: Linux, Windows, or OS X"""
 
@@ -87,11 +146,23 @@ def linux_ensure_compiler_in_path():
         sys.exit('ERROR: Could not find any valid C or C++ compiler, please install gcc before continuing')
 
 
+# vswhere runs vswhere.exe on every query, and the installed Visual Studio does not change while we run
+@functools.lru_cache(maxsize=1)
+def _get_vs_path():
+    import vswhere
+    return vswhere.get_latest_path()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_vs_major_version():
+    import vswhere
+    return vswhere.get_latest_major_version()
+
+
 def windows_ensure_compiler_in_path():
     """Ensures that PATH contains the cl.exe compiler from Microsoft Visual Studio.
     Prompts the user if not found."""
-    import vswhere
-    vs_path = vswhere.get_latest_path()
+    vs_path = _get_vs_path()
     if not vs_path:
         sys.exit("ERROR: Could not find Visual Studio, please ensure that you have Visual Studio installed")
 
@@ -111,6 +182,7 @@ def ensure_compiler_in_path():
         linux_ensure_compiler_in_path()
 
 
+@functools.lru_cache(maxsize=None)
 def get_lib_prefix():
     if get_platform() == OperatingSystem.Windows:
         return ""
@@ -118,6 +190,7 @@ def get_lib_prefix():
         return "lib"
 
 
+@functools.lru_cache(maxsize=None)
 def get_lib_extension(shared=False):
     if get_platform() == OperatingSystem.Windows:
         return ".dll" if shared else ".lib"
@@ -135,20 +208,32 @@ def get_file_extension(file_name):
     return os.path.splitext(file_name)[-1]
 
 
-# NOTE: here we assume that all source files are already in "src_dir"
-#       We might need to change that in the future.
-def generate_and_run_cmake_file(
+_CMAKE_TEMPLATE_PATTERN = re.compile(
+    r"@(GEN_EXECUTABLE_NAME|GEN_STATIC_LIB|GEN_DYNAMIC_LIB|GENERATED_SOURCE_FILES|GEN_LINK_LIBS|GEN_INCLUDE_PATHS)@"
+)
+
+
+def _write_file_if_changed(path, contents):
+    # leaving an up-to-date file untouched keeps its timestamp, so the build tool
+    # does not regenerate or rebuild anything that depends on it
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == contents:
+                return
+
+    with open(path, mode="wt") as f:
+        f.write(contents)
+
+
+def _write_cmake_file(
     target_name,
     src_dir,
-    dest_dir,
-    build_targets=[BUILD_TARGET.DYNAMIC_LIB],
-    build_type="RelWithDebInfo",
+    cmake_dir,
     additional_include_filepaths=[],
     additional_link_filepaths=[],
     additional_src_filepaths=[],
     profile=False
-) -> Mapping[BUILD_TARGET, str]:
-
+):
     template_cmake_filename = os.path.join(src_dir, 'CMakeLists.txt.in')
     generated_cmake_filename = 'CMakeLists.txt'
 
@@ -171,70 +256,71 @@ def generate_and_run_cmake_file(
             # TODO: specify this dependency in the hat package and remove this patch
             lib_files += ["legacy_stdio_definitions.lib"]
 
-    for src_file in os.listdir(src_dir):
-        extension = get_file_extension(src_file)
-        if extension in [".h", ".hat", ".c", ".cpp"]:
-            src_files.append("${CMAKE_CURRENT_SOURCE_DIR}/" + src_file)
-        elif extension in [".lib", ".a", ".obj", ".o"]:
-            lib_files.append("${CMAKE_CURRENT_SOURCE_DIR}/" + src_file)
+    with os.scandir(src_dir) as entries:
+        for entry in entries:
+            extension = get_file_extension(entry.name)
+            if extension in [".h", ".hat", ".c", ".cpp"]:
+                src_files.append("${CMAKE_CURRENT_SOURCE_DIR}/" + entry.name)
+            elif extension in [".lib", ".a", ".obj", ".o"]:
+                lib_files.append("${CMAKE_CURRENT_SOURCE_DIR}/" + entry.name)
 
     with open(template_cmake_filename) as f:
-        template_lines = f.readlines()
-
-    with open(os.path.join(dest_dir, generated_cmake_filename), mode="wt") as f:
-        delimiter = "@"
-        mappings = {
-            "GEN_EXECUTABLE_NAME": target_name,
-            "GEN_STATIC_LIB": f"{target_name}{BUILD_TARGET.STATIC_LIB.value}",
-            "GEN_DYNAMIC_LIB": f"{target_name}{BUILD_TARGET.DYNAMIC_LIB.value}",
-            "GENERATED_SOURCE_FILES": " ".join(src_files),
-            "GEN_LINK_LIBS": " ".join(lib_files),
-            "GEN_INCLUDE_PATHS": " ".join(include_paths)
-        }
-        for line in template_lines:
-            for template in mappings:
-                line = line.replace(f"{delimiter}{template}{delimiter}", mappings[template])
-            f.write(line)
+        template = f.read()
+
+    mappings = {
+        "GEN_EXECUTABLE_NAME": target_name,
+        "GEN_STATIC_LIB": f"{target_name}{BUILD_TARGET.STATIC_LIB.value}",
+        "GEN_DYNAMIC_LIB": f"{target_name}{BUILD_TARGET.DYNAMIC_LIB.value}",
+        "GENERATED_SOURCE_FILES": " ".join(src_files),
+        "GEN_LINK_LIBS": " ".join(lib_files),
+        "GEN_INCLUDE_PATHS": " ".join(include_paths)
+    }
+    contents = _CMAKE_TEMPLATE_PATTERN.sub(lambda match: mappings[match.group(1)], template)
+
+    _write_file_if_changed(os.path.join(cmake_dir, generated_cmake_filename), contents)
 
-    build_dir = os.path.join(dest_dir, f"build_{target_name}")
-    if not os.path.exists(build_dir):
-        os.mkdir(build_dir)
 
+def _run_cmake_configure(build_dir, build_type, profile):
     if get_platform() == OperatingSystem.Windows:
-        import vswhere
         windows_ensure_compiler_in_path()
         run_command(
-            f'cmake -G "Visual Studio {vswhere.get_latest_major_version()}" -Ax64 ..', working_directory=build_dir
+            ["cmake", "-G", f"Visual Studio {_get_vs_major_version()}", "-Ax64", ".."], working_directory=build_dir
         )
     else:
-        profiling_flags = "-DPROFILING_MODE=ON" if profile else ""
-        run_command(f'cmake -G Ninja -DCMAKE_BUILD_TYPE={build_type} {profiling_flags} ..', working_directory=build_dir)
-
-    targets = {t: f"{target_name}{t.value}"
-               for t in build_targets}
+        profiling_flags = ["-DPROFILING_MODE=ON"] if profile else []
+        run_command(
+            ["cmake", "-G", "Ninja", f"-DCMAKE_BUILD_TYPE={build_type}"] + profiling_flags + [".."],
+            working_directory=build_dir
+        )
 
-    #logging.info(f"running cmake --build . --config {build_type} --target {' '.join(targets.values())}")
-    run_command(
-        f"cmake --build . --config {build_type} --target {' '.join(targets.values())}", working_directory=build_dir
-    )
 
-    # Post-build cleaning
-    config_build_dir = os.path.join(build_dir, build_type) if get_platform() == OperatingSystem.Windows else build_dir
-    src_files = list(
-        filter(
-            lambda x: target_name in x and os.path.isfile(os.path.join(config_build_dir, x)),
-            os.listdir(config_build_dir)
+def _run_cmake_build(build_dir, build_type, targets):
+    if get_platform() != OperatingSystem.Windows and shutil.which("ninja"):
+        # the build tree uses the Ninja generator: skip the cmake wrapper process
+        # (ninja re-runs cmake by itself if any CMakeLists.txt has changed)
+        run_command(["ninja"] + list(targets), working_directory=build_dir)
+    else:
+        # --parallel also turns on multi-process builds for MSBuild (/m), which otherwise builds serially
+        #logging.info(f"running cmake --build . --config {build_type} --target {' '.join(targets)}")
+        run_command(
+            ["cmake", "--build", ".", "--config", build_type, "--parallel", str(os.cpu_count() or 1), "--target"] +
+            list(targets),
+            working_directory=build_dir
         )
-    )
+
+
+def _collect_build_outputs(target_build_dir, build_type, target_name, dest_dir):
+    config_build_dir = os.path.join(target_build_dir, build_type) if get_platform() == OperatingSystem.Windows else target_build_dir
+    # DirEntry.is_file() is answered from the directory listing on most platforms, without a stat per entry
+    with os.scandir(config_build_dir) as entries:
+        src_files = [entry.name for entry in entries if target_name in entry.name and entry.is_file()]
 
     # copy source files to source directory
     for file in src_files:
         shutil.copy(src=os.path.join(config_build_dir, file), dst=dest_dir)
 
-    # clean the build directory except when debugging
-    if build_type != BUILD_TYPE.DEBUG.value:
-        shutil.rmtree(build_dir)
 
+def _get_target_filenames(targets: Mapping[BUILD_TARGET, str]) -> Mapping[BUILD_TARGET, str]:
     target_filenames = {}
     for type, target in targets.items():
         if type == BUILD_TARGET.DYNAMIC_LIB:
@@ -244,4 +330,173 @@ def generate_and_run_cmake_file(
         else:
             target_filenames[type] = target
 
-    return target_filenames
\ No newline at end of file
+    return target_filenames
+
+
+# NOTE: here we assume that all source files are already in "src_dir"
+#       We might need to change that in the future.
+def generate_and_run_cmake_file(
+    target_name,
+    src_dir,
+    dest_dir,
+    build_targets=[BUILD_TARGET.DYNAMIC_LIB],
+    build_type="RelWithDebInfo",
+    additional_include_filepaths=[],
+    additional_link_filepaths=[],
+    additional_src_filepaths=[],
+    profile=False
+) -> Mapping[BUILD_TARGET, str]:
+
+    _write_cmake_file(
+        target_name, src_dir, dest_dir, additional_include_filepaths, additional_link_filepaths,
+        additional_src_filepaths, profile
+    )
+
+    build_dir = os.path.join(dest_dir, f"build_{target_name}")
+    if not os.path.exists(build_dir):
+        os.mkdir(build_dir)
+
+    _run_cmake_configure(build_dir, build_type, profile)
+
+    targets = {t: f"{target_name}{t.value}"
+               for t in build_targets}
+
+    _run_cmake_build(build_dir, build_type, targets.values())
+
+    # the build directory is kept so that building the same target again is incremental,
+    # call clean_build_cache to remove it
+    _collect_build_outputs(build_dir, build_type, target_name, dest_dir)
+
+    return _get_target_filenames(targets)
+
+
+def clean_build_cache(dest_dir):
+    """Removes the build directories that generate_and_run_cmake_file and BuildSession keep in `dest_dir`"""
+    with os.scandir(dest_dir) as entries:
+        build_dirs = [
+            entry.path for entry in entries
+            if entry.is_dir() and (entry.name.startswith("build_") or entry.name.startswith(_BUILD_SESSION_DIRNAME))
+        ]
+
+    for build_dir in build_dirs:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+class BuildSession:
+    """A CMake project that is shared by several targets, e.g. the native profilers of
+    all the functions in a HAT package.
+
+    The project is configured by the first build. Each target is generated into its own
+    subdirectory of the project, so building more targets only regenerates the build
+    files instead of configuring a new project (compiler detection, etc.) every time.
+    Targets can also be added first with `add` and then built all at once with `build_pending`.
+    Call `close` to remove the project once all targets have been built."""
+
+    def __init__(self, dest_dir, build_type="RelWithDebInfo", profile=False):
+        self.dest_dir = dest_dir
+        self.build_type = build_type
+        self.profile = profile
+        # each session gets a directory of its own (created by the first `add`), so that sessions
+        # sharing `dest_dir` do not remove each other's project when they are closed
+        self.session_dir = None
+        self.target_names = []
+        self.pending_targets = {}
+        self.configured = False
+
+    @property
+    def build_dir(self):
+        return os.path.join(self.session_dir, "build")
+
+    def _write_project_file(self):
+        lines = ["cmake_minimum_required(VERSION 3.14 FATAL_ERROR)\n", "project(HAT_BUILD_SESSION CXX)\n"]
+        lines += [f"add_subdirectory({target_name})\n" for target_name in self.target_names]
+        _write_file_if_changed(os.path.join(self.session_dir, "CMakeLists.txt"), "".join(lines))
+
+    def add(
+        self,
+        target_name,
+        src_dir,
+        build_targets=[BUILD_TARGET.DYNAMIC_LIB],
+        additional_include_filepaths=[],
+        additional_link_filepaths=[],
+        additional_src_filepaths=[]
+    ) -> Mapping[BUILD_TARGET, str]:
+        """Adds (or updates) a target in the project without building it. The target is built
+        by the next call to `build_pending`, together with all the other pending targets"""
+        if self.session_dir is None:
+            self.session_dir = tempfile.mkdtemp(prefix=_BUILD_SESSION_DIRNAME + "_", dir=self.dest_dir)
+        target_dir = os.path.join(self.session_dir, target_name)
+        os.makedirs(target_dir, exist_ok=True)
+
+        _write_cmake_file(
+            target_name, src_dir, target_dir, additional_include_filepaths, additional_link_filepaths,
+            additional_src_filepaths, self.profile
+        )
+
+        if target_name not in self.target_names:
+            self.target_names.append(target_name)
+            # the build step regenerates the build files when the project file changes
+            self._write_project_file()
+
+        targets = {t: f"{target_name}{t.value}"
+                   for t in build_targets}
+        self.pending_targets[target_name] = list(targets.values())
+
+        return _get_target_filenames(targets)
+
+    def remove(self, target_name):
+        """Removes a target from the project, e.g. before its sources are deleted, so that the
+        build files regenerated for the other targets no longer refer to them"""
+        if target_name not in self.target_names:
+            return
+        self.target_names.remove(target_name)
+        self.pending_targets.pop(target_name, None)
+        self._write_project_file()
+        shutil.rmtree(os.path.join(self.session_dir, target_name), ignore_errors=True)
+
+    def build_pending(self):
+        """Builds all the pending targets with a single build command, so that the build tool
+        can compile them in parallel, and copies their outputs to `dest_dir`"""
+        if not self.pending_targets:
+            return
+
+        os.makedirs(self.build_dir, exist_ok=True)
+        if not self.configured:
+            _run_cmake_configure(self.build_dir, self.build_type, self.profile)
+            self.configured = True
+
+        pending_targets, self.pending_targets = self.pending_targets, {}
+        _run_cmake_build(
+            self.build_dir, self.build_type, [target for targets in pending_targets.values() for target in targets]
+        )
+        for target_name in pending_targets:
+            _collect_build_outputs(
+                os.path.join(self.build_dir, target_name), self.build_type, target_name, self.dest_dir
+            )
+
+    def build(
+        self,
+        target_name,
+        src_dir,
+        build_targets=[BUILD_TARGET.DYNAMIC_LIB],
+        additional_include_filepaths=[],
+        additional_link_filepaths=[],
+        additional_src_filepaths=[]
+    ) -> Mapping[BUILD_TARGET, str]:
+        """Adds (or updates) a target in the project, builds it (and any other pending target),
+        and copies its outputs to `dest_dir`"""
+        target_filenames = self.add(
+            target_name, src_dir, build_targets, additional_include_filepaths, additional_link_filepaths,
+            additional_src_filepaths
+        )
+        self.build_pending()
+        return target_filenames
+
+    def close(self):
+        # keep the project when debugging
+        if self.session_dir and self.build_type != BUILD_TYPE.DEBUG.value:
+            shutil.rmtree(self.session_dir, ignore_errors=True)
+        self.session_dir = None
+        self.target_names = []
+        self.pending_targets = {}
+        self.configured = False
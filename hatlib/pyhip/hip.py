@@ -5,7 +5,9 @@ TODO: move to a submodule
 """
 
 import ctypes
+import functools
 import sys
+import threading
 
 _libhip_libname = 'libamdhip64.so'
 
@@ -20,9 +22,13 @@ if _libhip is None:
     raise OSError('hiprtc library not found')
 
 
+@functools.lru_cache(maxsize=None)
 def POINTER(obj):
     """
     ctype pointer to object
+
+    that also accepts None (as a null pointer). The from_param override is
+    installed once per pointer type.
     """
     p = ctypes.POINTER(obj)
     if not isinstance(p.from_param, classmethod):
@@ -70,362 +76,93 @@ class hipError(Exception):
     pass
 
 
-class hipErrorInvalidValue(hipError):
-    __doc__ = _libhip.hipGetErrorString(1)
-    pass
-
-
-class hipErrorOutOfMemory(hipError):
-    __doc__ = _libhip.hipGetErrorString(2)
-    pass
-
-
-class hipErrorNotInitialized(hipError):
-    __doc__ = _libhip.hipGetErrorString(3)
-    pass
-
-
-class hipErrorDeinitialized(hipError):
-    __doc__ = _libhip.hipGetErrorString(4)
-    pass
-
-
-class hipErrorProfilerDisabled(hipError):
-    __doc__ = _libhip.hipGetErrorString(5)
-    pass
-
-
-class hipErrorProfilerNotInitialized(hipError):
-    __doc__ = _libhip.hipGetErrorString(6)
-    pass
-
-
-class hipErrorProfilerAlreadyStarted(hipError):
-    __doc__ = _libhip.hipGetErrorString(7)
-    pass
-
-
-class hipErrorProfilerAlreadyStopped(hipError):
-    __doc__ = _libhip.hipGetErrorString(8)
-    pass
-
-
-class hipErrorInvalidConfiguration(hipError):
-    __doc__ = _libhip.hipGetErrorString(9)
-    pass
-
-
-class hipErrorInvalidSymbol(hipError):
-    __doc__ = _libhip.hipGetErrorString(13)
-    pass
-
-
-class hipErrorInvalidDevicePointer(hipError):
-    __doc__ = _libhip.hipGetErrorString(17)
-    pass
-
-
-class hipErrorInvalidMemcpyDirection(hipError):
-    __doc__ = _libhip.hipGetErrorString(21)
-    pass
-
-
-class hipErrorInsufficientDriver(hipError):
-    __doc__ = _libhip.hipGetErrorString(35)
-    pass
-
-
-class hipErrorMissingConfiguration(hipError):
-    __doc__ = _libhip.hipGetErrorString(52)
-    pass
-
-
-class hipErrorPriorLaunchFailure(hipError):
-    __doc__ = _libhip.hipGetErrorString(53)
-    pass
-
-
-class hipErrorInvalidDeviceFunction(hipError):
-    __doc__ = _libhip.hipGetErrorString(98)
-    pass
-
-
-class hipErrorNoDevice(hipError):
-    __doc__ = _libhip.hipGetErrorString(100)
-    pass
-
-
-class hipErrorInvalidDevice(hipError):
-    __doc__ = _libhip.hipGetErrorString(101)
-    pass
-
-
-class hipErrorInvalidImage(hipError):
-    __doc__ = _libhip.hipGetErrorString(200)
-    pass
-
-
-class hipErrorInvalidContext(hipError):
-    __doc__ = _libhip.hipGetErrorString(201)
-    pass
-
-
-class hipErrorContextAlreadyCurrent(hipError):
-    __doc__ = _libhip.hipGetErrorString(202)
-    pass
-
-
-class hipErrorMapFailed(hipError):
-    __doc__ = _libhip.hipGetErrorString(205)
-    pass
-
-
-class hipErrorUnmapFailed(hipError):
-    __doc__ = _libhip.hipGetErrorString(206)
-    pass
-
-
-class hipErrorArrayIsMapped(hipError):
-    __doc__ = _libhip.hipGetErrorString(207)
-    pass
-
-
-class hipErrorAlreadyMapped(hipError):
-    __doc__ = _libhip.hipGetErrorString(208)
-    pass
-
-
-class hipErrorNoBinaryForGpu(hipError):
-    __doc__ = _libhip.hipGetErrorString(209)
-    pass
-
-
-class hipErrorAlreadyAcquired(hipError):
-    __doc__ = _libhip.hipGetErrorString(210)
-    pass
-
-
-class hipErrorNotMapped(hipError):
-    __doc__ = _libhip.hipGetErrorString(211)
-    pass
-
-
-class hipErrorNotMappedAsArray(hipError):
-    __doc__ = _libhip.hipGetErrorString(212)
-    pass
-
-
-class hipErrorNotMappedAsPointer(hipError):
-    __doc__ = _libhip.hipGetErrorString(213)
-    pass
-
-
-class hipErrorECCNotCorrectable(hipError):
-    __doc__ = _libhip.hipGetErrorString(214)
-    pass
-
-
-class hipErrorUnsupportedLimit(hipError):
-    __doc__ = _libhip.hipGetErrorString(215)
-    pass
-
-
-class hipErrorContextAlreadyInUse(hipError):
-    __doc__ = _libhip.hipGetErrorString(216)
-    pass
-
-
-class hipErrorPeerAccessUnsupported(hipError):
-    __doc__ = _libhip.hipGetErrorString(217)
-    pass
-
-
-class hipErrorInvalidKernelFile(hipError):
-    __doc__ = _libhip.hipGetErrorString(218)
-    pass
-
-
-class hipErrorInvalidGraphicsContext(hipError):
-    __doc__ = _libhip.hipGetErrorString(219)
-    pass
-
-
-class hipErrorInvalidSource(hipError):
-    __doc__ = _libhip.hipGetErrorString(300)
-    pass
-
-
-class hipErrorFileNotFound(hipError):
-    __doc__ = _libhip.hipGetErrorString(301)
-    pass
-
-
-class hipErrorSharedObjectSymbolNotFound(hipError):
-    __doc__ = _libhip.hipGetErrorString(302)
-    pass
-
-
-class hipErrorSharedObjectInitFailed(hipError):
-    __doc__ = _libhip.hipGetErrorString(303)
-    pass
-
-
-class hipErrorOperatingSystem(hipError):
-    __doc__ = _libhip.hipGetErrorString(304)
-    pass
-
-
-class hipErrorInvalidHandle(hipError):
-    __doc__ = _libhip.hipGetErrorString(400)
-    pass
-
-
-class hipErrorNotFound(hipError):
-    __doc__ = _libhip.hipGetErrorString(500)
-    pass
-
-
-class hipErrorNotReady(hipError):
-    __doc__ = _libhip.hipGetErrorString(600)
-    pass
-
-
-class hipErrorIllegalAddress(hipError):
-    __doc__ = _libhip.hipGetErrorString(700)
-    pass
-
-
-class hipErrorLaunchOutOfResources(hipError):
-    __doc__ = _libhip.hipGetErrorString(701)
-    pass
-
-
-class hipErrorLaunchTimeOut(hipError):
-    __doc__ = _libhip.hipGetErrorString(702)
-    pass
-
-
-class hipErrorPeerAccessAlreadyEnabled(hipError):
-    __doc__ = _libhip.hipGetErrorString(704)
-    pass
-
-
-class hipErrorPeerAccessNotEnabled(hipError):
-    __doc__ = _libhip.hipGetErrorString(705)
-    pass
-
-
-class hipErrorSetOnActiveProcess(hipError):
-    __doc__ = _libhip.hipGetErrorString(708)
-    pass
-
-
-class hipErrorAssert(hipError):
-    __doc__ = _libhip.hipGetErrorString(710)
-    pass
-
-
-class hipErrorHostMemoryAlreadyRegistered(hipError):
-    __doc__ = _libhip.hipGetErrorString(712)
-    pass
-
-
-class hipErrorHostMemoryNotRegistered(hipError):
-    __doc__ = _libhip.hipGetErrorString(713)
-    pass
-
-
-class hipErrorLaunchFailure(hipError):
-    __doc__ = _libhip.hipGetErrorString(719)
-    pass
-
-
-class hipErrorCooperativeLaunchTooLarge(hipError):
-    __doc__ = _libhip.hipGetErrorString(720)
-    pass
-
-
-class hipErrorNotSupported(hipError):
-    __doc__ = _libhip.hipGetErrorString(801)
-    pass
-
+_HIP_ERROR_NAMES = {
+    1: 'hipErrorInvalidValue',
+    2: 'hipErrorOutOfMemory',
+    3: 'hipErrorNotInitialized',
+    4: 'hipErrorDeinitialized',
+    5: 'hipErrorProfilerDisabled',
+    6: 'hipErrorProfilerNotInitialized',
+    7: 'hipErrorProfilerAlreadyStarted',
+    8: 'hipErrorProfilerAlreadyStopped',
+    9: 'hipErrorInvalidConfiguration',
+    13: 'hipErrorInvalidSymbol',
+    17: 'hipErrorInvalidDevicePointer',
+    21: 'hipErrorInvalidMemcpyDirection',
+    35: 'hipErrorInsufficientDriver',
+    52: 'hipErrorMissingConfiguration',
+    53: 'hipErrorPriorLaunchFailure',
+    98: 'hipErrorInvalidDeviceFunction',
+    100: 'hipErrorNoDevice',
+    101: 'hipErrorInvalidDevice',
+    200: 'hipErrorInvalidImage',
+    201: 'hipErrorInvalidContext',
+    202: 'hipErrorContextAlreadyCurrent',
+    205: 'hipErrorMapFailed',
+    206: 'hipErrorUnmapFailed',
+    207: 'hipErrorArrayIsMapped',
+    208: 'hipErrorAlreadyMapped',
+    209: 'hipErrorNoBinaryForGpu',
+    210: 'hipErrorAlreadyAcquired',
+    211: 'hipErrorNotMapped',
+    212: 'hipErrorNotMappedAsArray',
+    213: 'hipErrorNotMappedAsPointer',
+    214: 'hipErrorECCNotCorrectable',
+    215: 'hipErrorUnsupportedLimit',
+    216: 'hipErrorContextAlreadyInUse',
+    217: 'hipErrorPeerAccessUnsupported',
+    218: 'hipErrorInvalidKernelFile',
+    219: 'hipErrorInvalidGraphicsContext',
+    300: 'hipErrorInvalidSource',
+    301: 'hipErrorFileNotFound',
+    302: 'hipErrorSharedObjectSymbolNotFound',
+    303: 'hipErrorSharedObjectInitFailed',
+    304: 'hipErrorOperatingSystem',
+    400: 'hipErrorInvalidHandle',
+    500: 'hipErrorNotFound',
+    600: 'hipErrorNotReady',
+    700: 'hipErrorIllegalAddress',
+    701: 'hipErrorLaunchOutOfResources',
+    702: 'hipErrorLaunchTimeOut',
+    704: 'hipErrorPeerAccessAlreadyEnabled',
+    705: 'hipErrorPeerAccessNotEnabled',
+    708: 'hipErrorSetOnActiveProcess',
+    710: 'hipErrorAssert',
+    712: 'hipErrorHostMemoryAlreadyRegistered',
+    713: 'hipErrorHostMemoryNotRegistered',
+    719: 'hipErrorLaunchFailure',
+    720: 'hipErrorCooperativeLaunchTooLarge',
+    801: 'hipErrorNotSupported',
+    999: 'hipErrorUnknown',
+    1052: 'hipErrorRuntimeMemory',
+    1053: 'hipErrorRuntimeOther'
+}
 
-class hipErrorUnknown(hipError):
-    __doc__ = _libhip.hipGetErrorString(999)
-    pass
 
+class _HipErrorDoc:
+    """
+    Docstring of a hip error class.
 
-class hipErrorRuntimeMemory(hipError):
-    __doc__ = _libhip.hipGetErrorString(1052)
-    pass
+    Looked up with hipGetErrorString when it is read, rather than with one call
+    per error class when the module is imported, and cached.
+    """
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _error_string(status):
+        return _libhip.hipGetErrorString(status).decode('utf-8')
 
-class hipErrorRuntimeOther(hipError):
-    __doc__ = _libhip.hipGetErrorString(1053)
-    pass
+    def __get__(self, instance, owner):
+        return self._error_string(owner.status)
 
 
-hipExceptions = {
-    1: hipErrorInvalidValue,
-    2: hipErrorOutOfMemory,
-    3: hipErrorNotInitialized,
-    4: hipErrorDeinitialized,
-    5: hipErrorProfilerDisabled,
-    6: hipErrorProfilerNotInitialized,
-    7: hipErrorProfilerAlreadyStarted,
-    8: hipErrorProfilerAlreadyStopped,
-    9: hipErrorInvalidConfiguration,
-    13: hipErrorInvalidSymbol,
-    17: hipErrorInvalidDevicePointer,
-    21: hipErrorInvalidMemcpyDirection,
-    35: hipErrorInsufficientDriver,
-    52: hipErrorMissingConfiguration,
-    53: hipErrorPriorLaunchFailure,
-    98: hipErrorInvalidDeviceFunction,
-    100: hipErrorNoDevice,
-    101: hipErrorInvalidDevice,
-    200: hipErrorInvalidImage,
-    201: hipErrorInvalidContext,
-    202: hipErrorContextAlreadyCurrent,
-    205: hipErrorMapFailed,
-    206: hipErrorUnmapFailed,
-    207: hipErrorArrayIsMapped,
-    208: hipErrorAlreadyMapped,
-    209: hipErrorNoBinaryForGpu,
-    210: hipErrorAlreadyAcquired,
-    211: hipErrorNotMapped,
-    212: hipErrorNotMappedAsArray,
-    213: hipErrorNotMappedAsPointer,
-    214: hipErrorECCNotCorrectable,
-    215: hipErrorUnsupportedLimit,
-    216: hipErrorContextAlreadyInUse,
-    217: hipErrorPeerAccessUnsupported,
-    218: hipErrorInvalidKernelFile,
-    219: hipErrorInvalidGraphicsContext,
-    300: hipErrorInvalidSource,
-    301: hipErrorFileNotFound,
-    302: hipErrorSharedObjectSymbolNotFound,
-    303: hipErrorSharedObjectInitFailed,
-    304: hipErrorOperatingSystem,
-    400: hipErrorInvalidHandle,
-    500: hipErrorNotFound,
-    600: hipErrorNotReady,
-    700: hipErrorIllegalAddress,
-    701: hipErrorLaunchOutOfResources,
-    702: hipErrorLaunchTimeOut,
-    704: hipErrorPeerAccessAlreadyEnabled,
-    705: hipErrorPeerAccessNotEnabled,
-    708: hipErrorSetOnActiveProcess,
-    710: hipErrorAssert,
-    712: hipErrorHostMemoryAlreadyRegistered,
-    713: hipErrorHostMemoryNotRegistered,
-    719: hipErrorLaunchFailure,
-    720: hipErrorCooperativeLaunchTooLarge,
-    801: hipErrorNotSupported,
-    999: hipErrorUnknown,
-    1052: hipErrorRuntimeMemory,
-    1053: hipErrorRuntimeOther
-}
+hipExceptions = {}
+for _status, _name in _HIP_ERROR_NAMES.items():
+    hipExceptions[_status] = globals()[_name] = type(_name, (hipError, ), {
+        '__doc__': _HipErrorDoc(),
+        'status': _status
+    })
+del _status, _name
 
 
 def hipCheckStatus(status):
@@ -445,13 +182,33 @@ def hipCheckStatus(status):
     hipExceptions
     """
 
-    if status != 0:
-        try:
-            e = hipExceptions[status]
-        except KeyError:
-            raise hipError('unknown hip error %s' % status)
-        else:
-            raise e
+    if status:
+        e = hipExceptions.get(status)
+        if e is None:
+            raise hipError(f'unknown hip error {status}')
+        raise e
+
+
+class _OutArgs(threading.local):
+    """
+    Out-parameters (and their byref pointers) of the frequently called wrappers.
+
+    Created once per thread instead of on every call. The wrappers read the
+    values back before returning, so a thread's instances are never shared.
+    """
+
+    def __init__(self):
+        self.int_value = ctypes.c_int()
+        self.int_ref = ctypes.byref(self.int_value)
+        self.float_value = ctypes.c_float()
+        self.float_ref = ctypes.byref(self.float_value)
+        self.free = ctypes.c_size_t()
+        self.free_ref = ctypes.byref(self.free)
+        self.total = ctypes.c_size_t()
+        self.total_ref = ctypes.byref(self.total)
+
+
+_out_args = _OutArgs()
 
 
 # Stream management
@@ -476,7 +233,8 @@ def hipStreamCreate():
     """
     ptr = ctypes.c_void_p()
     status = _libhip.hipStreamCreate(ctypes.byref(ptr))
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
     return ptr
 
 
@@ -500,7 +258,8 @@ def hipStreamDestroy(ptr):
         Valid pointer to stream object.
     """
     status = _libhip.hipStreamDestroy(ptr)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipStreamDestroy.restype = int
@@ -523,7 +282,8 @@ def hipStreamDestroy(ptr):
         Valid pointer to stream object.
     """
     status = _libhip.hipStreamDestroy(ptr)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipStreamSynchronize.restype = int
@@ -549,7 +309,175 @@ def hipStreamSynchronize(ptr):
         Valid pointer to stream object.
     """
     status = _libhip.hipStreamSynchronize(ptr)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
+
+
+_libhip.hipStreamWaitEvent.restype = int
+_libhip.hipStreamWaitEvent.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint]
+
+
+def hipStreamWaitEvent(stream, event, flags=0):
+    """
+    Make a stream wait for an event.
+
+    This command is host-asynchronous: the work queued in the stream after it
+    only starts once the event (as last recorded) has completed.
+
+    Parameters
+    -------
+    stream : ctypes pointer
+        Stream that waits.
+    event : ctypes pointer
+        Event to wait for.
+    flags : int, optional
+        Must be 0.
+    """
+    status = _libhip.hipStreamWaitEvent(stream, event, flags)
+    if status:
+        hipCheckStatus(status)
+
+
+# Graph management
+
+# Stream capture modes
+hipStreamCaptureModeGlobal = 0
+hipStreamCaptureModeThreadLocal = 1
+hipStreamCaptureModeRelaxed = 2
+
+_libhip.hipStreamBeginCapture.restype = int
+_libhip.hipStreamBeginCapture.argtypes = [ctypes.c_void_p, ctypes.c_int]
+
+
+def hipStreamBeginCapture(stream, mode=hipStreamCaptureModeGlobal):
+    """
+    Begin graph capture on a stream.
+
+    The work queued to the stream is recorded into a graph instead of being executed,
+    until hipStreamEndCapture is called.
+
+    Parameters
+    ----------
+    stream : ctypes pointer
+        Stream to capture (must not be the null stream).
+    mode : int
+        Capture mode.
+    """
+    status = _libhip.hipStreamBeginCapture(stream, mode)
+    if status:
+        hipCheckStatus(status)
+
+
+_libhip.hipStreamEndCapture.restype = int
+_libhip.hipStreamEndCapture.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_void_p)]
+
+
+def hipStreamEndCapture(stream):
+    """
+    End graph capture on a stream.
+
+    Parameters
+    ----------
+    stream : ctypes pointer
+        Stream being captured.
+
+    Returns
+    -------
+    graph : ctypes pointer
+        The captured graph.
+    """
+    graph = ctypes.c_void_p()
+    status = _libhip.hipStreamEndCapture(stream, ctypes.byref(graph))
+    if status:
+        hipCheckStatus(status)
+    return graph
+
+
+_libhip.hipGraphInstantiate.restype = int
+_libhip.hipGraphInstantiate.argtypes = [
+    ctypes.POINTER(ctypes.c_void_p),    # graph exec
+    ctypes.c_void_p,    # graph
+    ctypes.POINTER(ctypes.c_void_p),    # error node
+    ctypes.c_char_p,    # log buffer
+    ctypes.c_size_t
+]    # log buffer size
+
+
+def hipGraphInstantiate(graph):
+    """
+    Create an executable graph from a graph.
+
+    Parameters
+    ----------
+    graph : ctypes pointer
+        Graph to instantiate.
+
+    Returns
+    -------
+    graph_exec : ctypes pointer
+        The executable graph.
+    """
+    graph_exec = ctypes.c_void_p()
+    status = _libhip.hipGraphInstantiate(ctypes.byref(graph_exec), graph, None, None, 0)
+    if status:
+        hipCheckStatus(status)
+    return graph_exec
+
+
+_libhip.hipGraphLaunch.restype = int
+_libhip.hipGraphLaunch.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+
+
+def hipGraphLaunch(graph_exec, stream=None):
+    """
+    Launch an executable graph in a stream.
+
+    Parameters
+    ----------
+    graph_exec : ctypes pointer
+        Executable graph to launch.
+    stream : ctypes pointer, optional
+        Stream in which to launch the graph.
+    """
+    status = _libhip.hipGraphLaunch(graph_exec, stream)
+    if status:
+        hipCheckStatus(status)
+
+
+_libhip.hipGraphExecDestroy.restype = int
+_libhip.hipGraphExecDestroy.argtypes = [ctypes.c_void_p]
+
+
+def hipGraphExecDestroy(graph_exec):
+    """
+    Destroy an executable graph.
+
+    Parameters
+    ----------
+    graph_exec : ctypes pointer
+        Executable graph to destroy.
+    """
+    status = _libhip.hipGraphExecDestroy(graph_exec)
+    if status:
+        hipCheckStatus(status)
+
+
+_libhip.hipGraphDestroy.restype = int
+_libhip.hipGraphDestroy.argtypes = [ctypes.c_void_p]
+
+
+def hipGraphDestroy(graph):
+    """
+    Destroy a graph.
+
+    Parameters
+    ----------
+    graph : ctypes pointer
+        Graph to destroy.
+    """
+    status = _libhip.hipGraphDestroy(graph)
+    if status:
+        hipCheckStatus(status)
 
 
 # Event management
@@ -592,7 +520,8 @@ def hipEventCreateWithFlags(flags):
     """
     ptr = ctypes.c_void_p()
     status = _libhip.hipEventCreateWithFlags(ctypes.byref(ptr), flags)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
     return ptr
 
 
@@ -612,7 +541,8 @@ def hipEventCreate():
     """
     ptr = ctypes.c_void_p()
     status = _libhip.hipEventCreate(ctypes.byref(ptr))
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
     return ptr
 
 
@@ -633,7 +563,8 @@ def hipEventRecord(event, stream=None):
 
     """
     status = _libhip.hipEventRecord(event, stream)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipEventDestroy.restype = int
@@ -651,7 +582,8 @@ def hipEventDestroy(ptr):
 
     """
     status = _libhip.hipEventDestroy(ptr)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipEventSynchronize.restype = int
@@ -674,7 +606,8 @@ def hipEventSynchronize(ptr):
 
     """
     status = _libhip.hipEventSynchronize(ptr)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipEventElapsedTime.restype = int
@@ -702,10 +635,11 @@ def hipEventElapsedTime(start, stop):
     stop : ctypes pointer
         Stop event.
     """
-    t = ctypes.c_float()
-    status = _libhip.hipEventElapsedTime(ctypes.byref(t), start, stop)
-    hipCheckStatus(status)
-    return t.value
+    out_args = _out_args
+    status = _libhip.hipEventElapsedTime(out_args.float_ref, start, stop)
+    if status:
+        hipCheckStatus(status)
+    return out_args.float_value.value
 
 
 # Memory allocation functions (adapted from pystream):
@@ -736,7 +670,8 @@ def hipMalloc(count, ctype=None):
 
     ptr = ctypes.c_void_p()
     status = _libhip.hipMalloc(ctypes.byref(ptr), count)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
     if ctype is not None:
         ptr = ctypes.cast(ptr, ctypes.POINTER(ctype))
     return ptr
@@ -761,7 +696,66 @@ def hipFree(ptr):
     """
 
     status = _libhip.hipFree(ptr)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
+
+
+# hipHostMalloc flags
+hipHostMallocDefault = 0x0
+hipHostMallocPortable = 0x1
+hipHostMallocMapped = 0x2
+hipHostMallocWriteCombined = 0x4
+
+_libhip.hipHostMalloc.restype = int
+_libhip.hipHostMalloc.argtypes = [ctypes.POINTER(ctypes.c_void_p), ctypes.c_size_t, ctypes.c_uint]
+
+
+def hipHostMalloc(count, flags=hipHostMallocDefault):
+    """
+    Allocate pinned host memory.
+
+    Allocate page-locked host memory, which the device can access directly,
+    so that copies from and to it run at full bandwidth and asynchronously.
+
+    Parameters
+    ----------
+    count : int
+        Number of bytes of memory to allocate
+    flags : int, optional
+        hipHostMalloc flags.
+
+    Returns
+    -------
+    ptr : ctypes pointer
+        Pointer to allocated host memory.
+
+    """
+
+    ptr = ctypes.c_void_p()
+    status = _libhip.hipHostMalloc(ctypes.byref(ptr), count, flags)
+    if status:
+        hipCheckStatus(status)
+    return ptr
+
+
+_libhip.hipHostFree.restype = int
+_libhip.hipHostFree.argtypes = [ctypes.c_void_p]
+
+
+def hipHostFree(ptr):
+    """
+    Free pinned host memory.
+
+    Parameters
+    ----------
+    ptr : ctypes pointer
+        Pointer to memory allocated with hipHostMalloc.
+
+    """
+
+    status = _libhip.hipHostFree(ptr)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipMallocPitch.restype = int
@@ -781,7 +775,7 @@ def hipMallocPitch(pitch, rows, cols, elesize):
     Parameters
     ----------
     pitch : int
-        Pitch for allocation.
+        Unused: the pitch is chosen by hip and returned.
     rows : int
         Requested pitched allocation height.
     cols : int
@@ -793,13 +787,18 @@ def hipMallocPitch(pitch, rows, cols, elesize):
     -------
     ptr : ctypes pointer
         Pointer to allocated device memory.
+    pitch : int
+        Pitch of the allocation, in bytes.
 
     """
 
     ptr = ctypes.c_void_p()
-    status = _libhip.hipMallocPitch(ctypes.byref(ptr), ctypes.c_size_t(pitch), cols * elesize, rows)
-    hipCheckStatus(status)
-    return ptr, pitch
+    # the pitch is an out-parameter
+    pitch = ctypes.c_size_t()
+    status = _libhip.hipMallocPitch(ctypes.byref(ptr), ctypes.byref(pitch), cols * elesize, rows)
+    if status:
+        hipCheckStatus(status)
+    return ptr, pitch.value
 
 
 # Memory copy modes:
@@ -823,15 +822,16 @@ def hipMemcpy_htod(dst, src, count):
     ----------
     dst : ctypes pointer
         Device memory pointer.
-    src : ctypes pointer
-        Host memory pointer.
+    src : ctypes pointer or int
+        Host memory pointer (e.g. the ctypes.data address of a numpy array).
     count : int
         Number of bytes to copy.
 
     """
 
-    status = _libhip.hipMemcpy(dst, src, ctypes.c_size_t(count), hipMemcpyHostToDevice)
-    hipCheckStatus(status)
+    status = _libhip.hipMemcpy(dst, src, count, hipMemcpyHostToDevice)
+    if status:
+        hipCheckStatus(status)
 
 
 def hipMemcpy_dtoh(dst, src, count):
@@ -840,6 +840,57 @@ def hipMemcpy_dtoh(dst, src, count):
 
     Copy data from device memory to host memory.
 
+    Parameters
+    ----------
+    dst : ctypes pointer or int
+        Host memory pointer (e.g. the ctypes.data address of a numpy array).
+    src : ctypes pointer
+        Device memory pointer.
+    count : int
+        Number of bytes to copy.
+
+    """
+
+    status = _libhip.hipMemcpy(dst, src, count, hipMemcpyDeviceToHost)
+    if status:
+        hipCheckStatus(status)
+
+
+_libhip.hipMemcpyAsync.restype = int
+_libhip.hipMemcpyAsync.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_void_p]
+
+
+def hipMemcpy_htod_async(dst, src, count, stream=None):
+    """
+    Copy memory from host to device asynchronously.
+
+    Queue a copy of data from host memory to device memory in a stream.
+
+    Parameters
+    ----------
+    dst : ctypes pointer
+        Device memory pointer.
+    src : ctypes pointer
+        Host memory pointer.
+    count : int
+        Number of bytes to copy.
+    stream : ctypes pointer, optional
+        Stream in which to queue the copy.
+
+    """
+
+    status = _libhip.hipMemcpyAsync(dst, src, count, hipMemcpyHostToDevice, stream)
+    if status:
+        hipCheckStatus(status)
+
+
+def hipMemcpy_dtoh_async(dst, src, count, stream=None):
+    """
+    Copy memory from device to host asynchronously.
+
+    Queue a copy of data from device memory to host memory in a stream.
+    The host memory must not be read before the stream is synchronized.
+
     Parameters
     ----------
     dst : ctypes pointer
@@ -848,11 +899,14 @@ def hipMemcpy_dtoh(dst, src, count):
         Device memory pointer.
     count : int
         Number of bytes to copy.
+    stream : ctypes pointer, optional
+        Stream in which to queue the copy.
 
     """
 
-    status = _libhip.hipMemcpy(dst, src, ctypes.c_size_t(count), hipMemcpyDeviceToHost)
-    hipCheckStatus(status)
+    status = _libhip.hipMemcpyAsync(dst, src, count, hipMemcpyDeviceToHost, stream)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipMemGetInfo.restype = int
@@ -872,11 +926,11 @@ def hipMemGetInfo():
 
     """
 
-    free = ctypes.c_size_t()
-    total = ctypes.c_size_t()
-    status = _libhip.hipMemGetInfo(ctypes.byref(free), ctypes.byref(total))
-    hipCheckStatus(status)
-    return free.value, total.value
+    out_args = _out_args
+    status = _libhip.hipMemGetInfo(out_args.free_ref, out_args.total_ref)
+    if status:
+        hipCheckStatus(status)
+    return out_args.free.value, out_args.total.value
 
 
 _libhip.hipSetDevice.restype = int
@@ -897,7 +951,8 @@ def hipSetDevice(dev):
     """
 
     status = _libhip.hipSetDevice(dev)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipGetDevice.restype = int
@@ -918,10 +973,11 @@ def hipGetDevice():
 
     """
 
-    dev = ctypes.c_int()
-    status = _libhip.hipGetDevice(ctypes.byref(dev))
-    hipCheckStatus(status)
-    return dev.value
+    out_args = _out_args
+    status = _libhip.hipGetDevice(out_args.int_ref)
+    if status:
+        hipCheckStatus(status)
+    return out_args.int_value.value
 
 
 class hipDeviceArch(ctypes.Structure):
@@ -1191,7 +1247,8 @@ def hipGetDeviceProperties(deviceId: int):
     """
     device_properties = hipDeviceProperties()
     status = _libhip.hipGetDeviceProperties(ctypes.pointer(device_properties), deviceId)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
     return device_properties
 
 
@@ -1234,7 +1291,8 @@ def hipPointerGetAttributes(ptr):
     attributes = hipPointerAttributes()
     status = \
         _libhip.hipPointerGetAttributes(ctypes.byref(attributes), ptr)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
     return attributes.memoryType, attributes.device
 
 
@@ -1262,7 +1320,56 @@ def hipModuleLoadData(data):
 
     module = ctypes.c_void_p()
     status = _libhip.hipModuleLoadData(ctypes.byref(module), data)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
+    return module
+
+
+# hipJitOption
+hipJitOptionMaxRegisters = 0
+hipJitOptionThreadsPerBlock = 1
+hipJitOptionWallTime = 2
+hipJitOptionInfoLogBuffer = 3
+hipJitOptionInfoLogBufferSizeBytes = 4
+hipJitOptionErrorLogBuffer = 5
+hipJitOptionErrorLogBufferSizeBytes = 6
+hipJitOptionOptimizationLevel = 7
+
+_libhip.hipModuleLoadDataEx.restype = int
+_libhip.hipModuleLoadDataEx.argtypes = [
+    ctypes.POINTER(ctypes.c_void_p),    # Module
+    ctypes.c_void_p,    # Image
+    ctypes.c_uint,    # numOptions
+    ctypes.POINTER(ctypes.c_int),    # options
+    ctypes.POINTER(ctypes.c_void_p)
+]    # optionValues
+
+
+def hipModuleLoadDataEx(data, options):
+    """
+    Load hip module data with JIT options
+
+    Parameters
+    ----------
+    data : ctypes pointer
+        Memory pointer to load.
+    options : dict
+        hipJitOption -> integer value, e.g. {hipJitOptionOptimizationLevel: 4}.
+        Note that the AMD platform currently ignores the JIT options.
+
+    Returns
+    -------
+    module : ctypes ptr
+        hip module
+    """
+
+    module = ctypes.c_void_p()
+    c_options = (ctypes.c_int * len(options))(*options.keys())
+    # the values are passed in the pointers themselves
+    c_option_values = (ctypes.c_void_p * len(options))(*options.values())
+    status = _libhip.hipModuleLoadDataEx(ctypes.byref(module), data, len(options), c_options, c_option_values)
+    if status:
+        hipCheckStatus(status)
     return module
 
 
@@ -1293,7 +1400,8 @@ def hipModuleGetFunction(module, func_name):
     e_func_name = func_name.encode('utf-8')
     kernel = ctypes.c_void_p()
     status = _libhip.hipModuleGetFunction(ctypes.byref(kernel), module, e_func_name)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
     return kernel
 
 
@@ -1311,7 +1419,8 @@ def hipModuleUnload(module):
         pointer to created module
     """
     status = _libhip.hipModuleUnload(module)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipModuleLaunchKernel.restype = int
@@ -1330,6 +1439,13 @@ _libhip.hipModuleLaunchKernel.argtypes = [
 ]    # extra
 
 
+_hipModuleLaunchKernel = _libhip.hipModuleLaunchKernel
+
+HIP_LAUNCH_PARAM_BUFFER_POINTER = 1
+HIP_LAUNCH_PARAM_BUFFER_SIZE = 2
+HIP_LAUNCH_PARAM_END = 3
+
+
 def hipModuleLaunchKernel(kernel, bx, by, bz, tx, ty, tz, shared, stream, struct):
     """
     Launch the kernel
@@ -1354,31 +1470,57 @@ def hipModuleLaunchKernel(kernel, bx, by, bz, tx, ty, tz, shared, stream, struct
         shared mem
     stream : ctype void ptr
         stream object
-    struct : ctypes structure
-        struct of packed up arguments of kernel
-    """
-    c_bx = ctypes.c_uint(bx)
-    c_by = ctypes.c_uint(by)
-    c_bz = ctypes.c_uint(bz)
-    c_tx = ctypes.c_uint(tx)
-    c_ty = ctypes.c_uint(ty)
-    c_tz = ctypes.c_uint(tz)
-    c_shared = ctypes.c_uint(shared)
-
-    ctypes.sizeof(struct)
-    hip_launch_param_buffer_ptr = ctypes.c_void_p(1)
-    hip_launch_param_buffer_size = ctypes.c_void_p(2)
-    hip_launch_param_buffer_end = ctypes.c_void_p(3)
+    struct : ctypes structure (or array)
+        struct of packed up arguments of kernel. It is only read during the call,
+        so a single struct can be reused (and its fields updated) across launches
+    """
     size = ctypes.c_size_t(ctypes.sizeof(struct))
-    p_size = ctypes.c_void_p(ctypes.addressof(size))
-    p_struct = ctypes.c_void_p(ctypes.addressof(struct))
     config = (ctypes.c_void_p * 5)(
-        hip_launch_param_buffer_ptr, p_struct, hip_launch_param_buffer_size, p_size, hip_launch_param_buffer_end
+        HIP_LAUNCH_PARAM_BUFFER_POINTER, ctypes.addressof(struct), HIP_LAUNCH_PARAM_BUFFER_SIZE,
+        ctypes.addressof(size), HIP_LAUNCH_PARAM_END
     )
-    nullptr = ctypes.POINTER(ctypes.c_void_p)(ctypes.c_void_p(0))
 
-    status = _libhip.hipModuleLaunchKernel(kernel, c_bx, c_by, c_bz, c_tx, c_ty, c_tz, c_shared, stream, None, config)
-    hipCheckStatus(status)
+    # the argtypes convert the python ints
+    status = _hipModuleLaunchKernel(kernel, bx, by, bz, tx, ty, tz, shared, stream, None, config)
+    if status:
+        hipCheckStatus(status)
+
+
+def make_kernel_launcher(kernel, bx, by, bz, tx, ty, tz, shared, stream, struct):
+    """
+    Specialize hipModuleLaunchKernel for a kernel that is launched repeatedly
+    with the same configuration
+
+    Parameters are the same as for hipModuleLaunchKernel. The launch parameters
+    are converted and the arguments config is packed once, so the fields of the
+    struct can still be updated between launches, but it must stay alive for as
+    long as the launcher is used.
+
+    Returns
+    -------
+    launch : callable
+        launches the kernel, takes no arguments
+    """
+    size = ctypes.c_size_t(ctypes.sizeof(struct))
+    config = (ctypes.c_void_p * 5)(
+        HIP_LAUNCH_PARAM_BUFFER_POINTER, ctypes.addressof(struct), HIP_LAUNCH_PARAM_BUFFER_SIZE,
+        ctypes.addressof(size), HIP_LAUNCH_PARAM_END
+    )
+    c_uint = ctypes.c_uint
+    args = (
+        kernel, c_uint(bx), c_uint(by), c_uint(bz), c_uint(tx), c_uint(ty), c_uint(tz), c_uint(shared), stream, None,
+        config
+    )
+    launch_kernel = _hipModuleLaunchKernel
+
+    def launch():
+        status = launch_kernel(*args)
+        if status:
+            hipCheckStatus(status)
+
+    # the config only holds the addresses of the size and the struct, keep them alive with the launcher
+    launch.keep_alive = (size, struct)
+    return launch
 
 
 _libhip.hipDeviceSynchronize.restype = int
@@ -1390,7 +1532,8 @@ def hipDeviceSynchronize():
     Device level sync
     """
     status = _libhip.hipDeviceSynchronize()
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
 
 
 _libhip.hipInit.restype = int
@@ -1410,4 +1553,25 @@ def hipInit(flags):
     """
     c_flags = ctypes.c_uint(flags)
     status = _libhip.hipInit(c_flags)
-    hipCheckStatus(status)
+    if status:
+        hipCheckStatus(status)
+
+
+_libhip.hipRuntimeGetVersion.restype = int
+_libhip.hipRuntimeGetVersion.argtypes = [ctypes.POINTER(ctypes.c_int)]
+
+
+def hipRuntimeGetVersion():
+    """
+    Get the version of the HIP runtime.
+
+    Returns
+    -------
+    version : int
+        Runtime version.
+    """
+    version = ctypes.c_int()
+    status = _libhip.hipRuntimeGetVersion(ctypes.byref(version))
+    if status:
+        hipCheckStatus(status)
+    return version.value
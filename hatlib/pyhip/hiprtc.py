@@ -5,38 +5,12 @@ TODO: move to a submodule
 """
 
 import ctypes
-import sys
+import functools
 
 # _libhiprtc_libname = 'libhiprtc.so' # Currently its the same library
-_libhiprtc_libname = 'libamdhip64.so'
-
-_libhiprtc = None
-if 'linux' in sys.platform:
-    _libhiprtc = ctypes.cdll.LoadLibrary(_libhiprtc_libname)
-else:
-    # Currently we do not support windows, mainly because I do not have a windows build of hip
-    raise RuntimeError('Only linux is supported')
-
-if _libhiprtc is None:
-    raise OSError('hiprtc library not found')
-
-
-def POINTER(obj):
-    """
-    ctype pointer to object
-    """
-    p = ctypes.POINTER(obj)
-    if not isinstance(p.from_param, classmethod):
-
-        def from_param(cls, x):
-            if x is None:
-                return cls()
-            else:
-                return x
-
-        p.from_param = classmethod(from_param)
-
-    return p
+# so reuse the handle that hip loaded (and the platform checks it made) instead of loading it again
+from .hip import _libhip as _libhiprtc
+from .hip import POINTER
 
 
 _libhiprtc.hiprtcGetErrorString.restype = ctypes.c_char_p
@@ -71,84 +45,64 @@ class hiprtcError(Exception):
     pass
 
 
-class hiprtcErrorOutOfMemory(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(1)
-    pass
-
-
-class hiprtcErrorProgramCreationFailure(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(2)
-    pass
-
-
-class hiprtcErrorInvalidInput(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(3)
-    pass
-
-
-class hiprtcErrorInvalidProgram(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(4)
-    pass
-
-
-class hiprtcErrorInvalidOption(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(5)
-    pass
-
-
-class hiprtcErrorCompilation(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(6)
-    pass
-
-
-class hiprtcErrorBuiltinOperationFailure(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(7)
-    pass
+_HIPRTC_ERROR_NAMES = {
+    1: 'hiprtcErrorOutOfMemory',
+    2: 'hiprtcErrorProgramCreationFailure',
+    3: 'hiprtcErrorInvalidInput',
+    4: 'hiprtcErrorInvalidProgram',
+    5: 'hiprtcErrorInvalidOption',
+    6: 'hiprtcErrorCompilation',
+    7: 'hiprtcErrorBuiltinOperationFailure',
+    8: 'hiprtcErrorNoNameExpressionAfterCompilation',
+    9: 'hiprtcErrorNoLoweredNamesBeforeCompilation',
+    10: 'hiprtcErrorNameExpressionNotValid',
+    11: 'hiprtcErrorInternalError'
+}
 
 
-class hiprtcErrorNoNameExpressionAfterCompilation(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(8)
-    pass
+class _HiprtcErrorDoc:
+    """
+    Docstring of a hiprtc error class.
 
+    Looked up with hiprtcGetErrorString when it is read, rather than with one call
+    per error class when the module is imported, and cached.
+    """
 
-class hiprtcErrorNoLoweredNamesBeforeCompilation(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(9)
-    pass
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _error_string(status):
+        return _libhiprtc.hiprtcGetErrorString(status).decode('utf-8')
 
+    def __get__(self, instance, owner):
+        return self._error_string(owner.status)
 
-class hiprtcErrorNameExpressionNotValid(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(10)
-    pass
 
+hiprtcExceptions = {}
+for _status, _name in _HIPRTC_ERROR_NAMES.items():
+    hiprtcExceptions[_status] = globals()[_name] = type(_name, (hiprtcError, ), {
+        '__doc__': _HiprtcErrorDoc(),
+        'status': _status
+    })
+del _status, _name
 
-class hiprtcErrorInternalError(hiprtcError):
-    __doc__ = _libhiprtc.hiprtcGetErrorString(11)
-    pass
 
+@functools.lru_cache(maxsize=64)
+def _c_strings(strings):
+    """
+    C array of the strings (utf-8 encoded, unless they already are bytes).
 
-hiprtcExceptions = {
-    1: hiprtcErrorOutOfMemory,
-    2: hiprtcErrorProgramCreationFailure,
-    3: hiprtcErrorInvalidInput,
-    4: hiprtcErrorInvalidProgram,
-    5: hiprtcErrorInvalidOption,
-    6: hiprtcErrorCompilation,
-    7: hiprtcErrorBuiltinOperationFailure,
-    8: hiprtcErrorNoNameExpressionAfterCompilation,
-    9: hiprtcErrorNoLoweredNamesBeforeCompilation,
-    10: hiprtcErrorNameExpressionNotValid,
-    11: hiprtcErrorInternalError
-}
+    Built once per tuple of strings: the same headers and options are passed
+    to every compilation. The array keeps the encoded strings alive.
+    """
+    return (ctypes.c_char_p * len(strings))(*(s if isinstance(s, bytes) else s.encode('utf-8') for s in strings))
 
 
 def hiprtcCheckStatus(status):
-    if status != 0:
-        try:
-            e = hiprtcExceptions[status]
-        except KeyError:
-            raise hiprtcError('unknown hiprtc error %s' % status)
-        else:
-            raise e
+    if status:
+        e = hiprtcExceptions.get(status)
+        if e is None:
+            raise hiprtcError(f'unknown hiprtc error {status}')
+        raise e
 
 
 _libhiprtc.hiprtcCreateProgram.restype = int
@@ -157,9 +111,9 @@ _libhiprtc.hiprtcCreateProgram.argtypes = [
     ctypes.POINTER(ctypes.c_char),  # Source
     ctypes.POINTER(ctypes.c_char),  # Name
     ctypes.c_int,  # numberOfHeaders
-    ctypes.POINTER(ctypes.c_char_p),  # header
+    ctypes.POINTER(ctypes.c_char_p),  # headers (the header sources)
     ctypes.POINTER(ctypes.c_char_p)
-]  # headerNames
+]  # includeNames (the header names)
 
 
 def hiprtcCreateProgram(source, name, header_names, header_sources):
@@ -172,10 +126,10 @@ def hiprtcCreateProgram(source, name, header_names, header_sources):
         Source in python string
     name : string
         Program name
-    header_names: list of string
-        list of headernames
-    header_sources: list of string
+    header_names: list of string (or of utf-8 encoded bytes)
         list of headernames
+    header_sources: list of string (or of utf-8 encoded bytes)
+        list of header sources, in the same order as header_names
 
     Returns
     -------
@@ -186,25 +140,20 @@ def hiprtcCreateProgram(source, name, header_names, header_sources):
     # Encode strings to utf-8
     e_source = source.encode('utf-8')
     e_name = name.encode('utf-8')
-    e_header_names = list()
-    e_header_sources = list()
-    for header_name in header_names:
-        e_header_name = header_name.encode('utf-8')
-        e_header_names.append(e_header_name)
-    for header_source in header_sources:
-        e_header_source = header_source.encode('utf-8')
-        e_header_sources.append(e_header_source)
 
     prog = ctypes.c_void_p()
-    c_header_names = (ctypes.c_char_p * len(e_header_names))()
-    c_header_names[:] = e_header_names
-    c_header_sources = (ctypes.c_char_p * len(e_header_sources))()
-    c_header_sources[:] = e_header_sources
+    c_header_names = _c_strings(tuple(header_names))
+    c_header_sources = _c_strings(tuple(header_sources))
+
+    if len(c_header_names) != len(c_header_sources):
+        raise ValueError("header_names and header_sources must have the same length")
 
+    # hiprtc takes the header sources ("headers") before their names ("includeNames")
     status = _libhiprtc.hiprtcCreateProgram(ctypes.byref(prog), e_source,
-                                            e_name, len(e_header_names),
+                                            e_name, len(c_header_names),
                                             c_header_sources, c_header_names)
-    hiprtcCheckStatus(status)
+    if status:
+        hiprtcCheckStatus(status)
     return prog
 
 
@@ -223,7 +172,8 @@ def hiprtcDestroyProgram(prog):
         hiprtc program handle
     """
     status = _libhiprtc.hiprtcDestroyProgram(ctypes.byref(prog))
-    hiprtcCheckStatus(status)
+    if status:
+        hiprtcCheckStatus(status)
 
 
 _libhiprtc.hiprtcAddNameExpression.restype = int
@@ -246,7 +196,8 @@ def hiprtcAddNameExpression(prog, expression):
     """
     e_expression = expression.encode('utf-8')
     status = _libhiprtc.hiprtcAddNameExpression(prog, e_expression)
-    hiprtcCheckStatus(status)
+    if status:
+        hiprtcCheckStatus(status)
 
 
 _libhiprtc.hiprtcCompileProgram.restype = int
@@ -265,19 +216,15 @@ def hiprtcCompileProgram(prog, options):
     ----------
     prog : ctypes pointer
         hiprtc program handle
-    options : list of string
+    options : list of string (or of utf-8 encoded bytes)
         option list to be passed to compilation
     """
 
-    e_options = list()
-    for option in options:
-        e_options.append(option.encode('utf-8'))
-    c_options = (ctypes.c_char_p * len(e_options))()
-    c_options[:] = e_options
+    c_options = _c_strings(tuple(options))
     status = _libhiprtc.hiprtcCompileProgram(prog, len(c_options), c_options)
-    if status != 0:
+    if status:
         print(hiprtcGetProgramLog(prog))
-    hiprtcCheckStatus(status)
+        hiprtcCheckStatus(status)
 
 
 _libhiprtc.hiprtcGetProgramLogSize.restype = int
@@ -308,12 +255,13 @@ def hiprtcGetProgramLog(prog):
     """
     log_size = ctypes.c_size_t()
     status = _libhiprtc.hiprtcGetProgramLogSize(prog, ctypes.byref(log_size))
-    hiprtcCheckStatus(status)
-    log = "0" * log_size.value
-    e_log = log.encode('utf-8')
+    if status:
+        hiprtcCheckStatus(status)
+    e_log = ctypes.create_string_buffer(log_size.value)
     status = _libhiprtc.hiprtcGetProgramLog(prog, e_log)
-    hiprtcCheckStatus(status)
-    return e_log.decode('utf-8')
+    if status:
+        hiprtcCheckStatus(status)
+    return e_log.value.decode('utf-8')
 
 
 _libhiprtc.hiprtcGetCodeSize.restype = int
@@ -339,15 +287,16 @@ def hiprtcGetCode(prog):
 
     Returns
     -------
-    code : string
+    code : bytes
         hiprtc module code
     """
     code_size = ctypes.c_size_t()
     status = _libhiprtc.hiprtcGetCodeSize(prog, ctypes.byref(code_size))
-    hiprtcCheckStatus(status)
+    if status:
+        hiprtcCheckStatus(status)
 
-    code = "0" * code_size.value
-    e_code = code.encode('utf-8')
+    e_code = ctypes.create_string_buffer(code_size.value)
     status = _libhiprtc.hiprtcGetCode(prog, e_code)
-    hiprtcCheckStatus(status)
-    return e_code
+    if status:
+        hiprtcCheckStatus(status)
+    return e_code.raw
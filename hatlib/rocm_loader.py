@@ -1,91 +1,320 @@
+import atexit
 import ctypes
+import functools
+import hashlib
+import os
 import pathlib
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from typing import List
 
-from .arg_info import ArgInfo
 from .callable_func import CallableFunc
 from .function_info import FunctionInfo
-from .hat_file import Function
+from .hat_file import Function, UsageType
 from .gpu_headers import ROCM_HEADER_MAP
+from .rocm_mem import _RocmMemPool, get_rocm_mem_layout, plan_transfers, select_transfers
 from .pyhip.hip import *
 from .pyhip.hiprtc import *
 
 
+# the headers never change, so they are encoded for hiprtc only once
+_ROCM_HEADER_NAMES = [name.encode('utf-8') for name in ROCM_HEADER_MAP.keys()]
+_ROCM_HEADER_SOURCES = [source.encode('utf-8') for source in ROCM_HEADER_MAP.values()]
+
+
+@functools.lru_cache(maxsize=None)
 def initialize_rocm():
-    # Initialize ROCM Driver API
+    # Initialize ROCM Driver API, once per process
     hipInit(0)
 
 
-def compile_rocm_program(rocm_src_path: pathlib.Path, func_name):
-    src = rocm_src_path.read_text()
+def _get_rocm_cache_dir():
+    # compiled programs are cached on disk unless HAT_ROCM_DISABLE_CACHE is set
+    if os.environ.get("HAT_ROCM_DISABLE_CACHE"):
+        return None
+    return pathlib.Path(os.environ.get("HAT_ROCM_CACHE_DIR") or pathlib.Path.home() / ".cache" / "hatlib" / "rocm")
+
+
+def _hash_rocm_program(src: str, options: List[str]):
+    # the key covers everything that affects the compiled code: the source, the headers,
+    # the compiler options (incl. the target arch) and the HIP runtime version
+    parts = [src, str(hipRuntimeGetVersion())] + options
+    for header_name, header_source in sorted(ROCM_HEADER_MAP.items()):
+        parts += [header_name, header_source]
+
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _read_rocm_cache_file(cache_path: pathlib.Path):
+    try:
+        return cache_path.read_bytes()
+    except OSError:
+        return None    # a missing or unreadable file is compiled again
+
+
+def _write_rocm_cache_file(cache_path: pathlib.Path, code: bytes):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so that concurrent processes never read a partial file
+        with tempfile.NamedTemporaryFile(dir=cache_path.parent, suffix=".tmp", delete=False) as f:
+            f.write(code)
+        os.replace(f.name, cache_path)
+    except OSError:
+        pass    # the cache is only an optimization
+
+
+@functools.lru_cache(maxsize=None)
+def get_rocm_device_arch(device_id: int):
+    # e.g. "gfx90a:sramecc+:xnack-"
+    return hipGetDeviceProperties(device_id).gcnArchName
+
+
+def compile_rocm_program(rocm_src_path: pathlib.Path, func_name, device_id: int = None):
+    # compile for the device the program will run on
+    if device_id is None:
+        device_id = hipGetDevice()
+    arch = get_rocm_device_arch(device_id)
+
+    # devices with different archs need different code objects
+    code = _HSACO_CACHE.get((rocm_src_path, arch))
+    if code:
+        return code
+
+    _HSACO_CACHE[(rocm_src_path, arch)] = code = _compile_rocm_src(rocm_src_path.read_text(), func_name, arch)
+    return code
+
+
+def _compile_rocm_src(src: str, func_name, arch: str):
+    options = [f'--offload-arch={arch}', '-O3', '-D__HIP_PLATFORM_AMD__']
+
+    program_hash = _hash_rocm_program(src, options)
+    code = _PROGRAM_CACHE.get(program_hash)
+    if code:
+        return code
+
+    cache_dir = _get_rocm_cache_dir()
+    cache_path = cache_dir / f"{program_hash}.hsaco" if cache_dir else None
+    if cache_path:
+        code = _read_rocm_cache_file(cache_path)
+        if code:
+            _PROGRAM_CACHE[program_hash] = code
+            return code
 
     prog = hiprtcCreateProgram(
         source=src,
         name=func_name + ".cu",
-        header_names=ROCM_HEADER_MAP.keys(),
-        header_sources=ROCM_HEADER_MAP.values()
+        header_names=_ROCM_HEADER_NAMES,
+        header_sources=_ROCM_HEADER_SOURCES
     )
-    device_properties = hipGetDeviceProperties(0)
-    hiprtcCompileProgram(prog, [f'--offload-arch={device_properties.gcnArchName}', '-D__HIP_PLATFORM_AMD__'])
-    code = hiprtcGetCode(prog)
+    try:
+        hiprtcCompileProgram(prog, options)
+        code = hiprtcGetCode(prog)
+    finally:
+        hiprtcDestroyProgram(prog)
+    _PROGRAM_CACHE[program_hash] = code
+
+    if cache_path:
+        _write_rocm_cache_file(cache_path, code)
 
     return code
 
 
-def get_func_from_rocm_program(rocm_program, func_name):
-    rocm_module = hipModuleLoadData(rocm_program)
-    kernel = hipModuleGetFunction(rocm_module, func_name)
+def get_func_from_rocm_program(rocm_program, func_name, jit_options: dict = None):
+    """Returns the function func_name of the program, loaded for the current device.
+    jit_options (hipJitOption -> value) are passed to hipModuleLoadDataEx, but the AMD platform
+    currently ignores them: the register and optimization settings are applied when compiling"""
+    # hiprtc already returns a code object that is finalized for the device arch, so loading it
+    # only has to upload it to the (current) device. It is still done once per code object and
+    # device: the modules stay loaded until the process exits.
+    device_id = hipGetDevice()
+    module_key = (rocm_program, device_id, tuple(sorted(jit_options.items())) if jit_options else ())
+    kernel = _FUNC_CACHE.get(module_key + (func_name, ))
+    if kernel:
+        return kernel
+
+    rocm_module = _MODULE_CACHE.get(module_key)
+    if not rocm_module:
+        _MODULE_CACHE[module_key] = rocm_module = \
+            hipModuleLoadDataEx(rocm_program, jit_options) if jit_options else hipModuleLoadData(rocm_program)
+    _FUNC_CACHE[module_key + (func_name, )] = kernel = hipModuleGetFunction(rocm_module, func_name)
     return kernel
 
 
-cached_mem = []
+def _unload_rocm_modules():
+    for (_, device_id, _), rocm_module in _MODULE_CACHE.items():
+        hipSetDevice(device_id)
+        hipModuleUnload(rocm_module)
+    _MODULE_CACHE.clear()
+    _FUNC_CACHE.clear()
 
 
-def allocate_rocm_mem(benchmark: bool, arg_infos: List[ArgInfo], device_id: int):
-    device_mem = []
-    for arg in arg_infos:
-        try:
-            memory_cache = cached_mem[device_id]
-            if benchmark and arg.total_byte_size in memory_cache:
-                mem = memory_cache[arg.total_byte_size]
-            else:
-                mem = hipMalloc(arg.total_byte_size)
-                if benchmark:
-                    memory_cache[arg.total_byte_size] = mem
-        except:
-            free_rocm_mem(device_mem)
-            raise
-        device_mem.append(mem)
+# In-process caches (like jitify's), so that repeated compilations and module loads of
+# the same program, e.g. when autotuning, return immediately:
+#   (source path, device arch) -> code object, which skips reading and hashing the source
+_HSACO_CACHE = {}
+#   program hash (source and options) -> code object
+_PROGRAM_CACHE = {}
+#   (code object, device id, jit options) -> module
+_MODULE_CACHE = {}
+#   (code object, device id, jit options, function name) -> function
+_FUNC_CACHE = {}
+atexit.register(_unload_rocm_modules)
 
-    return device_mem
 
+# Add a separate pool for each gpu since device memory is not shareable (duh!)
+_rocm_mem_pools = {}    # (device id, pinned host memory?) -> pool
 
-def free_rocm_mem(args):
-    for arg in args:
-        hipFree(arg)
 
+def _get_rocm_mem_pool(device_id: int, pinned_host: bool = False):
+    pool = _rocm_mem_pools.get((device_id, pinned_host))
+    if pool is None:
+        malloc, free = (hipHostMalloc, hipHostFree) if pinned_host else (hipMalloc, hipFree)
+        pool = _RocmMemPool(malloc, free, hipErrorOutOfMemory)
+        _rocm_mem_pools[(device_id, pinned_host)] = pool
+    return pool
 
-def transfer_mem_host_to_rocm(device_args: List, host_args: List[np.array], arg_infos: List[ArgInfo]):
-    for device_arg, host_arg, arg_info in zip(device_args, host_args, arg_infos):
-        if 'input' in arg_info.usage.value:
-            hipMemcpy_htod(dst=device_arg, src=host_arg.ctypes.data, count=arg_info.total_byte_size)
 
+def _free_rocm_mem_pools():
+    for (device_id, _), pool in _rocm_mem_pools.items():
+        if pool.released:
+            hipSetDevice(device_id)
+            pool.free_released()
 
-def transfer_mem_rocm_to_host(device_args: List, host_args: List[np.array], arg_infos: List[ArgInfo]):
-    for device_arg, host_arg, arg_info in zip(device_args, host_args, arg_infos):
-        if 'output' in arg_info.usage.value:
-            hipMemcpy_dtoh(dst=host_arg.ctypes.data, src=device_arg, count=arg_info.total_byte_size)
 
+atexit.register(_free_rocm_mem_pools)
 
-def device_args_to_ptr_list(device_args: List):
-    ptrs = [np.array([int(d_arg)], dtype=np.uint64) for d_arg in device_args]
-    ptrs = np.array([ptr.ctypes.data for ptr in ptrs], dtype=np.uint64)
 
-    return ptrs
+def allocate_rocm_mem(mem_layout, device_id: int, pinned_host: bool = False):
+    """Allocates the device memory for all the arguments (laid out by get_rocm_mem_layout) as a single
+    allocation from the device's pool (or, with pinned_host, the pinned host memory to stage their
+    transfers). Returns the allocation (to be released with release_rocm_mem) and the pointer of each argument"""
+    offsets, total_size = mem_layout
+    mem_base = _get_rocm_mem_pool(device_id, pinned_host).allocate(total_size)
+    mem = [ctypes.c_void_p(mem_base.value + offset) for offset in offsets]
+    return mem_base, mem
 
 
-_HSACO_CACHE = {}
+def release_rocm_mem(mem_base, device_id: int, pinned_host: bool = False, user=None):
+    "Returns an allocation to its pool (once the device is done with it), recording who used it"
+    _get_rocm_mem_pool(device_id, pinned_host).release(mem_base, user)
+
+
+# The transfers are queued in streams, so they are ordered with the kernels without synchronizing
+# the device after every copy. The streams must be ordered with the launch stream by the caller,
+# and synchronized before the host arguments are read (or the device memory is released).
+#
+# The numpy arrays are pageable memory, which the driver can only copy by staging it through
+# pinned buffers of its own, synchronously. The arrays are staged here instead, in pinned host
+# memory laid out like the device arguments (staging_args), and the copies are truly async.
+
+# host array id -> (weak reference to the array, data address), since .ctypes.data builds a new
+# ctypes interface object on every access. The weak reference guards against reused ids, and
+# removes the entry when the array goes away.
+_host_ptr_cache = {}
+
+
+def _get_host_ptr(host_arg: np.ndarray):
+    key = id(host_arg)
+    entry = _host_ptr_cache.get(key)
+    if entry is not None and entry[0]() is host_arg:
+        return entry[1]
+
+    ptr = host_arg.ctypes.data
+    _host_ptr_cache[key] = (weakref.ref(host_arg, lambda _: _host_ptr_cache.pop(key, None)), ptr)
+    return ptr
+
+
+def transfer_mem_host_to_rocm(device_args: List, host_args: List[np.array], transfers, staging_args: List):
+    staged_args, copies = transfers
+    memmove = ctypes.memmove
+    for i, byte_size in staged_args:
+        memmove(staging_args[i], _get_host_ptr(host_args[i]), byte_size)
+    for i, byte_size, stream, _ in copies:
+        hipMemcpy_htod_async(device_args[i], staging_args[i], byte_size, stream)
+
+
+def transfer_mem_rocm_to_host(device_args: List, transfers, staging_args: List):
+    # the outputs must be copied to the host arguments with copy_staged_mem_to_host once the streams
+    # are synchronized
+    _, copies = transfers
+    for i, byte_size, stream, _ in copies:
+        hipMemcpy_dtoh_async(staging_args[i], device_args[i], byte_size, stream)
+
+
+def copy_staged_mem_to_host(staging_args: List, host_args: List[np.array], transfers):
+    staged_args, _ = transfers
+    memmove = ctypes.memmove
+    for i, byte_size in staged_args:
+        memmove(_get_host_ptr(host_args[i]), staging_args[i], byte_size)
+
+
+# number of streams that the argument transfers are spread over
+_ROCM_COPY_STREAMS = 2
+
+
+def compile_rocm_programs(rocm_funcs: List["RocmCallableFunc"], device_id: int = 0):
+    """Compiles the programs of several functions in parallel, ahead of their first run.
+    ctypes releases the GIL for the duration of each hiprtc call, so the compilations
+    of different programs run concurrently"""
+    arch = get_rocm_device_arch(device_id)
+    pending = {
+        func.rocm_src_path: func.func_info.name
+        for func in rocm_funcs if (func.rocm_src_path, arch) not in _HSACO_CACHE
+    }
+    if not pending:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 1)) as executor:
+        futures = [
+            executor.submit(compile_rocm_program, rocm_src_path, func_name, device_id)
+            for rocm_src_path, func_name in pending.items()
+        ]
+    for future in futures:
+        future.result()    # (re-)raise the compilation errors
+
+
+def start_rocm_warmup(rocm_funcs: List["RocmCallableFunc"], device_id: int = 0):
+    """When HAT_ROCM_WARMUP is set, compiles the programs of the functions in a background thread,
+    so that their first calls find them in the caches instead of waiting for hiprtc.
+    Returns the thread (or None)"""
+    if not os.environ.get("HAT_ROCM_WARMUP") or not rocm_funcs:
+        return None
+
+    def warm_up():
+        try:
+            compile_rocm_programs(rocm_funcs, device_id)
+        except Exception:
+            pass    # the failed programs are not cached, their first calls compile them again and report the errors
+
+    thread = threading.Thread(target=warm_up, name="hatlib-rocm-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _destroy_rocm_runtime(device_id: int, batch_graphs: dict, events: List, streams: List):
+    # a function of its own (rather than a method) so that the finalizer of a RocmCallableFunc,
+    # which calls it when the function is released or dropped, does not keep the function alive
+    current_device_id = hipGetDevice()
+    if current_device_id != device_id:
+        hipSetDevice(device_id)
+
+    for graph_exec in batch_graphs.values():
+        hipGraphExecDestroy(graph_exec)
+    batch_graphs.clear()
+    for event in events:
+        hipEventDestroy(event)
+    for stream in streams:
+        hipStreamDestroy(stream)
+
+    if current_device_id != device_id:
+        hipSetDevice(current_device_id)
 
 
 class RocmCallableFunc(CallableFunc):
@@ -95,90 +324,272 @@ class RocmCallableFunc(CallableFunc):
         self.hat_func = func
         self.func_info = FunctionInfo(func)
         self.kernel = None
+        self.device_id = None
+        self.device_mem_base = None
         self.device_mem = None
-        self.ptrs = None
+        self.staging_mem_base = None
+        self.staging_mem = None
         self.stream = None
+        self.copy_streams = []
+        self.copy_events = []
+        self.input_transfers = ((), ())
+        self.output_transfers = ((), ())
+        self.skippable_inputs = frozenset()
         self.start_event = None
         self.stop_event = None
+        self.batch_graphs = {}
+        self.mem_layout = None
+        self.data = None
+        self.data_mem_base = None
+        self.launch = None
+        self.runtime_key = None    # the (benchmark, device_id) that the runtime state above is set up for
+        self.runtime_finalizer = None    # destroys the streams, events and graphs of the runtime
         self.rocm_src_path = rocm_src_path
 
+        # Opt-in: don't upload the inputs that are the same host arrays as in the previous call
+        # again. Only valid when the caller does not modify its input arrays between calls.
+        self.skip_unchanged_inputs = False
+        self.last_input_ptrs = {}    # allocation address -> the input addresses last uploaded to it
+
+        # the calls queued by enqueue, which sync waits for
+        self.pending_calls = []
+
     def init_runtime(self, benchmark: bool, device_id: int, working_dir: str):
         if not benchmark:
             initialize_rocm()
 
         hipSetDevice(device_id)
 
-        # Add a separate cache for each gpu since device memory is not shareable (duh!)
-        while len(cached_mem) <= device_id:
-            cached_mem.append({})
+        # the kernel, streams, events, transfer plans and launcher only depend on the function and the
+        # device, so they are set up by the first call and reused by the following ones
+        runtime_key = (benchmark, device_id)
+        if self.runtime_key == runtime_key:
+            return
+        self.release_runtime()
 
-        rocm_program = _HSACO_CACHE.get(self.rocm_src_path)
-        if not rocm_program:
-            _HSACO_CACHE[self.rocm_src_path
-                         ] = rocm_program = compile_rocm_program(self.rocm_src_path, self.func_info.name)
+        rocm_program = compile_rocm_program(self.rocm_src_path, self.func_info.name, device_id)
 
         self.kernel = get_func_from_rocm_program(rocm_program, self.func_info.name)
 
+        # the transfers and launches of all the batches are queued in this stream (which, unlike
+        # the null stream, can also be captured into graphs for the timed launches), and only the
+        # stream is synchronized instead of the whole device
+        self.stream = hipStreamCreate()
+        self.start_event = hipEventCreate()
+        self.stop_event = hipEventCreate()
+
+        # outside benchmark mode, the argument transfers are spread over streams of their own
+        # (each with an event to order it with the launch stream)
+        if not benchmark:
+            self.copy_streams = [hipStreamCreate() for _ in range(_ROCM_COPY_STREAMS)]
+            self.copy_events = [hipEventCreateWithFlags(hipEventDisableTiming) for _ in range(_ROCM_COPY_STREAMS)]
+
+        # the arguments and their transfers are laid out once for all the batches
+        self.mem_layout = get_rocm_mem_layout(self.func_info.arguments)
+        if not benchmark:
+            self.input_transfers = plan_transfers(
+                self.func_info.arguments, "input", self.mem_layout, self.copy_streams
+            )
+            # the kernel may write the "input_output" arguments, so only the pure inputs can be skipped
+            self.skippable_inputs = frozenset(
+                i for i, arg_info in enumerate(self.func_info.arguments) if arg_info.usage == UsageType.Input
+            )
+            self.output_transfers = plan_transfers(
+                self.func_info.arguments, "output", self.mem_layout, self.copy_streams
+            )
+
+        # the kernel arguments are all device pointers, so they are packed as a plain array of pointers,
+        # which is reused for all the batches, only the device pointers are updated
+        self.data = (ctypes.c_void_p * len(self.func_info.arguments))()
+        self.data_mem_base = None
+
+        # the kernel, its launch configuration, the stream and the arguments struct are fixed for the run
+        self.launch = make_kernel_launcher(
+            self.kernel,
+            *self.hat_func.launch_parameters,    # [ grid[x-z], block[x-z] ]
+            self.hat_func.dynamic_shared_mem_bytes,    # dynamic shared memory
+            self.stream,    # stream
+            self.data,    # data
+        )
+
+        # the runtime is kept between the calls, so it is also destroyed when the function is dropped
+        events = [self.start_event, self.stop_event] + self.copy_events
+        streams = [self.stream] + self.copy_streams
+        self.runtime_finalizer = weakref.finalize(
+            self, _destroy_rocm_runtime, device_id, self.batch_graphs, events, streams
+        )
+        self.runtime_key = runtime_key
+
     def cleanup_runtime(self, benchmark: bool, working_dir: str):
-        pass
+        # outside benchmark mode, the runtime is kept for the next call (see release_runtime)
+        if benchmark:
+            self.release_runtime()
+
+    def release_runtime(self):
+        "Releases the streams, events and graphs that are kept between the calls of the function"
+        self.runtime_key = None
+        if self.runtime_finalizer:
+            self.runtime_finalizer()
+            self.runtime_finalizer = None
+
+        self.launch = None
+        self.data = None
+        self.data_mem_base = None
+        self.start_event = None
+        self.stop_event = None
+        self.copy_events = []
+        self.copy_streams = []
+        self.stream = None
 
     def init_batch(self, benchmark: bool, warmup_iters=0, device_id: int = 0, args=[]):
         self.func_info.verify(args[0] if benchmark else args)
-        self.device_mem = allocate_rocm_mem(benchmark, self.func_info.arguments, device_id)
+        self.device_id = device_id
+        self.device_mem_base, self.device_mem = allocate_rocm_mem(self.mem_layout, device_id)
 
         if not benchmark:
-            transfer_mem_host_to_rocm(device_args=self.device_mem, host_args=args, arg_infos=self.func_info.arguments)
-
-        class DataStruct(ctypes.Structure):
-            _fields_ = [(f"arg{i}", ctypes.c_void_p) for i in range(len(self.func_info.arguments))]
-
-        self.data = DataStruct(*self.device_mem)
+            # the transfers are staged through pinned host memory, which is reused like the device memory
+            self.staging_mem_base, self.staging_mem = allocate_rocm_mem(self.mem_layout, device_id, pinned_host=True)
+            transfer_mem_host_to_rocm(
+                device_args=self.device_mem,
+                host_args=args,
+                transfers=self._changed_input_transfers(args) if self.skip_unchanged_inputs else self.input_transfers,
+                staging_args=self.staging_mem
+            )
+            self._join_streams(self.copy_streams, self.copy_events, [self.stream])
 
-        self.start_event = hipEventCreate()
-        self.stop_event = hipEventCreate()
+        # the pool usually hands out the same allocation again, in which case the arguments
+        # (and the launches captured with them) are still up to date
+        if self.data_mem_base != self.device_mem_base.value:
+            self.data[:] = self.device_mem
+            self._destroy_batch_graphs()
+            self.data_mem_base = self.device_mem_base.value
 
+        launch = self.launch
         for _ in range(warmup_iters):
-            hipModuleLaunchKernel(
-                self.kernel,
-                *self.hat_func.launch_parameters,    # [ grid[x-z], block[x-z] ]
-                self.hat_func.dynamic_shared_mem_bytes,
-                0,    # stream
-                self.data,    # data
-            )
+            launch()
+
+    def _changed_input_transfers(self, args):
+        # the device copy of an input is still up to date if this function was the last one to use
+        # the allocation and the input is the same host array as last time
+        input_ptrs = {i: _get_host_ptr(args[i]) for i in self.skippable_inputs}
+        last_input_ptrs = self.last_input_ptrs.get(self.device_mem_base.value)
+        self.last_input_ptrs[self.device_mem_base.value] = input_ptrs
+        if last_input_ptrs is None or \
+                _get_rocm_mem_pool(self.device_id).last_users.get(self.device_mem_base.value) != id(self):
+            return self.input_transfers
+
+        changed = {i for i, ptr in input_ptrs.items() if ptr != last_input_ptrs.get(i)}
+        changed.update(i for i, _ in self.input_transfers[0] if i not in input_ptrs)
+        return select_transfers(self.input_transfers, changed)
+
+    @staticmethod
+    def _join_streams(streams, events, waiting_streams):
+        # the work queued next in the waiting streams waits for the work queued so far in the streams
+        for stream, event in zip(streams, events):
+            hipEventRecord(event, stream)
+            for waiting_stream in waiting_streams:
+                hipStreamWaitEvent(waiting_stream, event)
+
+    def _destroy_batch_graphs(self):
+        # (the dict is shared with the runtime finalizer)
+        for graph_exec in self.batch_graphs.values():
+            hipGraphExecDestroy(graph_exec)
+        self.batch_graphs.clear()
+
+    def _get_batch_graph(self, iters):
+        # capture a batch of launches once, each batch of the same size then is a single graph launch
+        graph_exec = self.batch_graphs.get(iters)
+        if graph_exec is None:
+            launch = self.launch
+            hipStreamBeginCapture(self.stream)
+            try:
+                for _ in range(iters):
+                    launch()
+            finally:
+                graph = hipStreamEndCapture(self.stream)
+            try:
+                graph_exec = hipGraphInstantiate(graph)
+            finally:
+                hipGraphDestroy(graph)
+            self.batch_graphs[iters] = graph_exec
+
+        return graph_exec
 
     def run_batch(self, benchmark: bool, iters, args=[]) -> float:
-        hipEventRecord(self.start_event)
-
-        for _ in range(iters):
-            hipModuleLaunchKernel(
-                self.kernel,
-                *self.hat_func.launch_parameters,    # [ grid[x-z], block[x-z] ]
-                self.hat_func.dynamic_shared_mem_bytes,    # dynamic shared memory
-                0,    # stream
-                self.data,    # data
-            )
-
-        hipEventRecord(self.stop_event)
+        if benchmark:
+            graph_exec = self._get_batch_graph(iters)
+            hipEventRecord(self.start_event, self.stream)
+            hipGraphLaunch(graph_exec, self.stream)
+        else:
+            launch = self.launch
+            hipEventRecord(self.start_event, self.stream)
+            for _ in range(iters):
+                launch()
+
+        hipEventRecord(self.stop_event, self.stream)
         hipEventSynchronize(self.stop_event)
-        batch_time_ms = hipEventElapsedTime(self.start_event, self.stop_event)
-
-        if not benchmark:
-            hipDeviceSynchronize()
-
-        return batch_time_ms
+        return hipEventElapsedTime(self.start_event, self.stop_event)
 
     def cleanup_batch(self, benchmark: bool, args=[]):
         # If there's no device mem, that means allocation during initialization failed, which means nothing else needs to be cleaned up either
-        if not benchmark and self.device_mem:
-            transfer_mem_rocm_to_host(device_args=self.device_mem, host_args=args, arg_infos=self.func_info.arguments)
-            free_rocm_mem(self.device_mem)
-        hipDeviceSynchronize()
-
-        if self.start_event:
-            hipEventDestroy(self.start_event)
-
-        if self.stop_event:
-            hipEventDestroy(self.stop_event)
+        copy_outputs = not benchmark and self.device_mem and self.staging_mem
+        if copy_outputs:
+            self._queue_outputs()
+        self._finish_batch(copy_outputs, args)
+
+    def enqueue(self, *args, stream=None, device_id: int = 0):
+        """Queues a call of the function with the given arguments and returns without waiting for it.
+        The output arguments are only valid after sync(). Several calls (of this function and of others)
+        can be queued before they are synced, so that they overlap each other and the host code.
+        With a stream (of the same device) the call is ordered with the caller's work in it: the call
+        starts after the work queued so far in the stream, and the work queued next waits for the call"""
+        self.init_runtime(benchmark=False, device_id=device_id, working_dir=None)
+        if stream is not None:
+            # (the launch stream waits for the copy streams, so it waits for the caller's stream too)
+            self._join_streams([stream], self.copy_events[:1], self.copy_streams)
+        self.init_batch(benchmark=False, device_id=device_id, args=args)
+        self.launch()
+        self._queue_outputs()
+        if stream is not None:
+            self._join_streams(self.copy_streams, self.copy_events, [stream])
+
+        # each queued call keeps its memory until it is synced
+        self.pending_calls.append(
+            (args, self.device_mem_base, self.device_mem, self.staging_mem_base, self.staging_mem)
+        )
+        self.device_mem_base, self.device_mem, self.staging_mem_base, self.staging_mem = None, None, None, None
+
+    def sync(self):
+        """Waits for the calls queued by enqueue(), and copies their outputs to the host arguments
+        (the calls are synced through the function's own streams, whatever stream they were queued in)"""
+        pending_calls, self.pending_calls = self.pending_calls, []
+        for args, self.device_mem_base, self.device_mem, self.staging_mem_base, self.staging_mem in pending_calls:
+            self._finish_batch(True, args)
+
+    def _queue_outputs(self):
+        # the output copies wait for the launches
+        self._join_streams([self.stream], self.copy_events[:1], self.copy_streams)
+        transfer_mem_rocm_to_host(
+            device_args=self.device_mem, transfers=self.output_transfers, staging_args=self.staging_mem
+        )
+
+    def _finish_batch(self, copy_outputs: bool, args):
+        hipStreamSynchronize(self.stream)
+        for copy_stream in self.copy_streams:
+            hipStreamSynchronize(copy_stream)
+
+        if copy_outputs:
+            copy_staged_mem_to_host(staging_args=self.staging_mem, host_args=args, transfers=self.output_transfers)
+
+        # the memory goes back to the pools for the next batch
+        if self.device_mem_base:
+            release_rocm_mem(self.device_mem_base, self.device_id, user=id(self))
+            self.device_mem_base = None
+            self.device_mem = None
+        if self.staging_mem_base:
+            release_rocm_mem(self.staging_mem_base, self.device_id, pinned_host=True)
+            self.staging_mem_base = None
+            self.staging_mem = None
 
     def should_flush_cache(self) -> bool:
         return False
@@ -0,0 +1,131 @@
+from typing import List
+
+from .arg_info import ArgInfo
+
+# The memory management of the ROCm loader that does not call ROCm itself (the pools are given the
+# allocation functions), so that it can be used and tested without the ROCm runtime
+
+# bytes of released allocations that a pool keeps for reuse (beyond the last released one)
+_ROCM_MEM_POOL_MAX_RELEASED_BYTES = 256 * 1024 * 1024
+
+
+class _RocmMemPool:
+    """Allocations of one device (or pinned host allocations), which are kept for reuse when
+    they are released instead of being freed, so that repeated batches do not pay for the
+    allocations. Allocations are only reused for the same size, so the released allocations
+    are capped, and freed when malloc raises out_of_memory_error"""
+
+    def __init__(self, malloc, free, out_of_memory_error, max_released_bytes=_ROCM_MEM_POOL_MAX_RELEASED_BYTES):
+        self.malloc = malloc
+        self.free = free
+        self.out_of_memory_error = out_of_memory_error
+        self.max_released_bytes = max_released_bytes
+        self.released = {}    # size -> allocations of that size that can be reused
+        self.released_bytes = 0
+        self.sizes = {}    # address -> size of each allocation
+        self.last_users = {}    # address -> the user that released each allocation last
+
+    def allocate(self, size: int):
+        released = self.released.get(size)
+        if released:
+            self.released_bytes -= size
+            allocation = released.pop()
+            if not released:
+                del self.released[size]
+            return allocation
+
+        try:
+            allocation = self.malloc(size)
+        except self.out_of_memory_error:
+            # the released allocations of other sizes may be what is using up the memory
+            if not self.released:
+                raise
+            self.free_released()
+            allocation = self.malloc(size)
+        self.sizes[allocation.value] = size
+        return allocation
+
+    def release(self, allocation, user=None):
+        size = self.sizes[allocation.value]
+        self.released.setdefault(size, []).append(allocation)
+        self.released_bytes += size
+        self.last_users[allocation.value] = user
+
+        # free the allocations that were released first (but keep this one, which is the most
+        # likely to be allocated again, e.g. by the next batch of a benchmark)
+        for released_size in list(self.released):
+            if self.released_bytes <= self.max_released_bytes:
+                break
+            allocations = self.released[released_size]
+            while allocations and self.released_bytes > self.max_released_bytes and allocations[0] is not allocation:
+                self._free(allocations.pop(0))
+                self.released_bytes -= released_size
+            if not allocations:
+                del self.released[released_size]
+
+    def free_released(self):
+        for allocations in self.released.values():
+            for allocation in allocations:
+                self._free(allocation)
+        self.released.clear()
+        self.released_bytes = 0
+
+    def _free(self, allocation):
+        del self.sizes[allocation.value]
+        self.last_users.pop(allocation.value, None)
+        self.free(allocation)
+
+
+# alignment of each argument within the device allocation (hipMalloc itself returns 256-byte aligned memory)
+_ROCM_MEM_ALIGNMENT = 256
+
+
+def get_rocm_mem_layout(arg_infos: List[ArgInfo]):
+    """Lays out the arguments in a single allocation, which only has to be done once per function.
+    Returns the offset of each argument and the total size"""
+    offsets = []
+    total_size = 0
+    for arg in arg_infos:
+        offsets.append(total_size)
+        total_size += -(-int(arg.total_byte_size) // _ROCM_MEM_ALIGNMENT) * _ROCM_MEM_ALIGNMENT
+    return tuple(offsets), total_size
+
+
+# arguments smaller than this that are next to each other in the layout are copied together
+_ROCM_SMALL_COPY_SIZE = 64 * 1024
+
+
+def plan_transfers(arg_infos: List[ArgInfo], usage: str, mem_layout, streams: List):
+    """Resolves the transfers of the arguments with the given usage ("input" or "output") once for
+    all the batches. Returns the (argument index, byte size) of each argument to stage, and the
+    (first argument index, byte size, stream, argument indices) of each copy: small arguments that
+    are next to each other share a copy, and the copies are spread over the streams, so that they
+    can overlap on devices with several copy engines"""
+    offsets, _ = mem_layout
+    staged_args = tuple(
+        (i, int(arg_info.total_byte_size)) for i, arg_info in enumerate(arg_infos) if usage in arg_info.usage.value
+    )
+
+    copies = []
+    for i, byte_size in staged_args:
+        if copies and byte_size < _ROCM_SMALL_COPY_SIZE:
+            first, copy_size, indices = copies[-1]
+            if indices[-1] == i - 1 and copy_size < _ROCM_SMALL_COPY_SIZE:
+                # (the padding between the arguments is copied along)
+                copies[-1] = (first, offsets[i] + byte_size - offsets[first], indices + (i, ))
+                continue
+        copies.append((i, byte_size, (i, )))
+
+    copies = tuple((first, copy_size, streams[n % len(streams)], indices)
+                   for n, (first, copy_size, indices) in enumerate(copies))
+    return staged_args, copies
+
+
+def select_transfers(transfers, arg_indices):
+    """Restricts transfers planned by plan_transfers to the copies of the given arguments.
+    A copy that is shared with other arguments sends their staging memory too, so they are
+    all staged again (the pinned memory may have been used by another function since)"""
+    staged_args, copies = transfers
+    copies = tuple(copy for copy in copies if any(i in arg_indices for i in copy[3]))
+    copied = {i for copy in copies for i in copy[3]}
+    return tuple(arg for arg in staged_args if arg[0] in copied), copies
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import enum
+import importlib.util
+import sys
+import types
+import unittest
+from unittest import mock
+from hatlib import Function
+
+
+def _import_cuda_loader():
+    if importlib.util.find_spec("cuda") is not None:
+        from hatlib import cuda_loader
+        return cuda_loader
+
+    # without cuda-python, the loader is imported against a stand-in of the package (which only
+    # stays in sys.modules for the import), and the tests patch the driver calls they make
+    class CUresult(enum.Enum):
+        CUDA_SUCCESS = 0
+
+    class nvrtcResult(enum.Enum):
+        NVRTC_SUCCESS = 0
+
+    cuda_package = types.ModuleType("cuda")
+    cuda_package.cuda = types.SimpleNamespace(CUresult=CUresult)
+    cuda_package.nvrtc = types.SimpleNamespace(nvrtcResult=nvrtcResult)
+    with mock.patch.dict(sys.modules, {"cuda": cuda_package}):
+        from hatlib import cuda_loader
+    return cuda_loader
+
+
+cuda_loader = _import_cuda_loader()
+
+
+class CudaLoader_test(unittest.TestCase):
+
+    def test_functions_sharing_a_provider(self):
+        success = cuda_loader.cuda.CUresult.CUDA_SUCCESS
+        driver = mock.Mock()
+        driver.CUresult = cuda_loader.cuda.CUresult
+        driver.cuModuleLoadData.return_value = (success, "module")
+        driver.cuModuleGetFunction.side_effect = lambda module, name: (success, (module, name))
+
+        funcs = [
+            cuda_loader.create_loader_for_device_function(Function(name=name, provider="kernels.cu"), "hat_dir")
+            for name in ("kernel_a", "kernel_b", "kernel_a")
+        ]
+        with mock.patch.object(cuda_loader, "cuda", driver), \
+                mock.patch.object(cuda_loader, "initialize_cuda"), \
+                mock.patch.object(cuda_loader, "compile_cuda_program", return_value=b"ptx") as compile_cuda_program, \
+                mock.patch.dict(cuda_loader._PTX_CACHE, clear=True), \
+                mock.patch.dict(cuda_loader._MODULE_CACHE, clear=True), \
+                mock.patch.dict(cuda_loader._KERNEL_CACHE, clear=True):
+            for func in funcs:
+                func.init_runtime(benchmark=False, device_id=0, working_dir=None)
+
+        # each function launches its own kernel, from the module that is compiled and loaded once
+        self.assertEqual([func.kernel for func in funcs],
+                         [("module", b"kernel_a"), ("module", b"kernel_b"), ("module", b"kernel_a")])
+        self.assertEqual(compile_cuda_program.call_count, 1)
+        self.assertEqual(driver.cuModuleLoadData.call_count, 1)
+        self.assertEqual(driver.cuModuleGetFunction.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
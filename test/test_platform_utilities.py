@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from hatlib import platform_utilities
+from hatlib.platform_utilities import BUILD_TARGET, BuildSession, run_command
+
+
+class RunCommand_test(unittest.TestCase):
+
+    def test_quiet_failure_keeps_output_tails(self):
+        script = "import sys\n" \
+            "for i in range(1000): print(f'out {i}')\n" \
+            "print('err', file=sys.stderr)\n" \
+            "sys.exit(3)\n"
+        with mock.patch.object(platform_utilities, "_OUTPUT_TAIL_LINES", 10), \
+                mock.patch("builtins.print"), \
+                self.assertRaises(subprocess.CalledProcessError) as context:
+            run_command([sys.executable, "-c", script], quiet=True)
+
+        # only the last lines of each stream are kept
+        error = context.exception
+        self.assertEqual(error.returncode, 3)
+        self.assertEqual(error.output.decode().splitlines(), [f"out {i}" for i in range(990, 1000)])
+        self.assertEqual(error.stderr.decode().splitlines(), ["err"])
+
+
+@unittest.skipUnless(
+    shutil.which("cmake") and (sys.platform == "win32" or shutil.which("ninja")), "requires CMake and Ninja"
+)
+class BuildSession_test(unittest.TestCase):
+
+    def test_timers_in_one_session(self):
+        with tempfile.TemporaryDirectory() as dest_dir:
+            session = BuildSession(dest_dir)
+            target_filenames = []
+            for name in ("first_timer", "second_timer"):
+                src_path = os.path.join(dest_dir, name + ".cpp")
+                with open(src_path, "w") as f:
+                    f.write(f'extern "C" int {name}() {{ return 0; }}\nint main() {{ return {name}(); }}\n')
+                target_filenames.append(
+                    session.add(
+                        target_name=name,
+                        src_dir=os.path.dirname(platform_utilities.__file__),
+                        additional_src_filepaths=[src_path]
+                    )[BUILD_TARGET.DYNAMIC_LIB]
+                )
+
+            # both timers are built by the project that is configured once
+            with mock.patch.object(
+                platform_utilities, "_run_cmake_configure", wraps=platform_utilities._run_cmake_configure
+            ) as run_cmake_configure:
+                session.build_pending()
+            self.assertEqual(run_cmake_configure.call_count, 1)
+            for filename in target_filenames:
+                self.assertTrue(os.path.isfile(os.path.join(dest_dir, filename)))
+
+            session_dir = session.session_dir
+            self.assertTrue(os.path.isdir(session_dir))
+            session.close()
+            self.assertFalse(os.path.exists(session_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+import unittest
+
+try:
+    from hatlib.pyhip import hiprtc
+except (OSError, RuntimeError):    # ROCm is not installed (or not supported on this platform)
+    hiprtc = None
+
+
+@unittest.skipUnless(hiprtc, "requires ROCm")
+class Hiprtc_test(unittest.TestCase):
+
+    def test_program_log(self):
+        prog = hiprtc.hiprtcCreateProgram(
+            source='extern "C" __global__ void broken() { undeclared_variable = 1; }',
+            name="broken.cu",
+            header_names=[],
+            header_sources=[]
+        )
+        try:
+            with self.assertRaises(hiprtc.hiprtcError):
+                hiprtc.hiprtcCompileProgram(prog, ["-O3"])
+
+            # the log is what hiprtc wrote, not the zero-initialized buffer
+            log = hiprtc.hiprtcGetProgramLog(prog)
+            self.assertIn("undeclared_variable", log)
+        finally:
+            hiprtc.hiprtcDestroyProgram(prog)
+
+    def test_mismatched_headers(self):
+        with self.assertRaises(ValueError):
+            hiprtc.hiprtcCreateProgram(
+                source="", name="empty.cu", header_names=["a.h", "b.h"], header_sources=["#pragma once"]
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
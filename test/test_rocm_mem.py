@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import ctypes
+import unittest
+from types import SimpleNamespace
+from hatlib import UsageType
+from hatlib import rocm_mem
+
+
+class OutOfMemory(Exception):
+    pass
+
+
+class RocmTransfers_test(unittest.TestCase):
+
+    def plan_input_transfers(self, arg_infos):
+        mem_layout = rocm_mem.get_rocm_mem_layout(arg_infos)
+        return rocm_mem.plan_transfers(arg_infos, "input", mem_layout, streams=[None])
+
+    def test_merged_small_inputs(self):
+        arg_infos = [SimpleNamespace(usage=UsageType.Input, total_byte_size=16) for _ in range(2)]
+        transfers = self.plan_input_transfers(arg_infos)
+        staged_args, copies = transfers
+        self.assertEqual(staged_args, ((0, 16), (1, 16)))
+        self.assertEqual(len(copies), 1)
+        self.assertEqual(copies[0][3], (0, 1))
+
+        # only the second input changed, but the shared copy sends both, so both are staged again
+        self.assertEqual(rocm_mem.select_transfers(transfers, {1}), transfers)
+        self.assertEqual(rocm_mem.select_transfers(transfers, set()), ((), ()))
+
+    def test_separate_inputs(self):
+        large_size = rocm_mem._ROCM_SMALL_COPY_SIZE
+        arg_infos = [SimpleNamespace(usage=UsageType.Input, total_byte_size=large_size) for _ in range(2)]
+        transfers = self.plan_input_transfers(arg_infos)
+        staged_args, copies = rocm_mem.select_transfers(transfers, {1})
+        self.assertEqual(staged_args, ((1, large_size), ))
+        self.assertEqual([copy[3] for copy in copies], [(1, )])
+
+
+class RocmMemPool_test(unittest.TestCase):
+
+    def make_pool(self, capacity, max_released_bytes):
+        self.live = {}
+
+        def malloc(size):
+            if sum(self.live.values()) + size > capacity:
+                raise OutOfMemory
+            allocation = ctypes.c_void_p(len(self.live) + 1 + max(self.live, default=0))
+            self.live[allocation.value] = size
+            return allocation
+
+        def free(allocation):
+            del self.live[allocation.value]
+
+        return rocm_mem._RocmMemPool(malloc, free, OutOfMemory, max_released_bytes)
+
+    def test_reuse(self):
+        pool = self.make_pool(capacity=1000, max_released_bytes=1000)
+        allocation = pool.allocate(100)
+        pool.release(allocation)
+        self.assertIs(pool.allocate(100), allocation)
+
+    def test_released_bytes_are_capped(self):
+        pool = self.make_pool(capacity=1000, max_released_bytes=300)
+        for size in (200, 100, 250):
+            pool.release(pool.allocate(size))
+        # the oldest releases are freed, the last one is kept even if it is over the cap on its own
+        self.assertEqual(list(pool.released), [250])
+        self.assertEqual(sorted(self.live.values()), [250])
+
+    def test_out_of_memory_frees_released(self):
+        pool = self.make_pool(capacity=1000, max_released_bytes=1000)
+        pool.release(pool.allocate(600))
+        pool.allocate(900)
+        self.assertEqual(sorted(self.live.values()), [900])
+        self.assertEqual(pool.released_bytes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+#include <stdint.h>
+#include <stdlib.h>
+#ifndef ALLOC
+#define ALLOC(size) ( malloc(size) )
+#endif
+#ifndef DEALLOC
+#define DEALLOC(X) ( free(X) )
+#endif
+#ifdef _MSC_VER
+#define DLL_EXPORT  __declspec( dllexport )
+#else
+#define DLL_EXPORT
+#endif
+#define DIM1 100
+#define DIM2 16
+DLL_EXPORT void Test_partial_dynamic( const float* A, uint32_t A_dim0, const float* B, float** C, uint32_t* C_dim0, float** D )
+{
+    // clamp the input size
+    (*C_dim0) = A_dim0 < DIM1*DIM2 ? A_dim0 : DIM1*DIM2;
+    (*C_dim0) = (*C_dim0) == 0 ? 1 : (*C_dim0);
+
+    (*C) = (float*)ALLOC((*C_dim0)*DIM1*DIM2*4);
+    (*D) = (float*)ALLOC((*C_dim0)*DIM1*DIM2*4);
+    for (unsigned i0 = 0; i0 < (*C_dim0); ++i0) {
+    for (unsigned i1 = 0; i1 < DIM1; ++i1) {
+    for (unsigned i2 = 0; i2 < DIM2; ++i2) {
+        *(*C + i0*DIM1*DIM2*1 + i1*DIM2*1 + i2*1) = *(A + i0*DIM1*DIM2*1 + i1*DIM2*1 + i2*1) + *(B + i0*DIM1*DIM2*1 + i1*DIM2*1 + i2*1);
+        *(*D + i0*DIM1*DIM2*1 + i1*DIM2*1 + i2*1) = *(A + i0*DIM1*DIM2*1 + i1*DIM2*1 + i2*1) - *(B + i0*DIM1*DIM2*1 + i1*DIM2*1 + i2*1);
+    }
+    }
+    }
+}
+
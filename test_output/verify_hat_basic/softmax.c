@@ -0,0 +1,29 @@
+#include <math.h>
+#include <stdint.h>
+
+#ifdef _MSC_VER
+#define DLL_EXPORT  __declspec( dllexport )
+#else
+#define DLL_EXPORT
+#endif
+
+DLL_EXPORT void Softmax(const float input[2][2], float output[2][2])
+{
+    /* Softmax 13 (TF, pytorch style)
+       axis = 0
+     */
+    for (uint32_t i1 = 0; i1 < 2; ++i1) {
+        float max = -INFINITY;
+        for (uint32_t i0 = 0; i0 < 2; ++i0) {
+            max = max > input[i0][i1] ? max : input[i0][i1];
+        }
+        float sum = 0.0;
+        for (uint32_t i0 = 0; i0 < 2; ++i0) {
+            sum += expf(input[i0][i1] - max);
+        }
+        for (uint32_t i0 = 0; i0 < 2; ++i0) {
+            output[i0][i1] = expf(input[i0][i1] - max) / sum;
+        }
+    }
+}
+
@@ -0,0 +1,28 @@
+#include <stdint.h>
+#include <stdlib.h>
+
+#ifndef ALLOC
+#define ALLOC(size) ( malloc(size) )
+#endif
+#ifndef DEALLOC
+#define DEALLOC(X) ( free(X) )
+#endif
+
+#ifdef _MSC_VER
+#define DLL_EXPORT  __declspec( dllexport )
+#else
+#define DLL_EXPORT
+#endif
+
+DLL_EXPORT void /* Unsqueeze_18 */ Unsqueeze(const float* data, const int64_t data_dim0, float** expanded, int64_t* dim0, int64_t* dim1)
+{
+    /* Unsqueeze */
+    *dim0 = 1;
+    *dim1 = data_dim0;
+    *expanded = (float*)ALLOC((*dim0) * (*dim1) * sizeof(float));
+    float* data_ = (float*)data;
+    float* expanded_ = (float*)(*expanded);
+    for (int64_t i = 0; i < data_dim0; ++i)
+        expanded_[i] = data_[i];
+}
+
@@ -0,0 +1,28 @@
+#include <stdint.h>
+#include <stdlib.h>
+#include <stdio.h>
+
+#ifndef ALLOC
+#define ALLOC(size) ( malloc(size) )
+#endif
+#ifndef DEALLOC
+#define DEALLOC(X) ( free(X) )
+#endif
+
+#ifdef _MSC_VER
+#define DLL_EXPORT  __declspec( dllexport )
+#else
+#define DLL_EXPORT
+#endif
+
+DLL_EXPORT void AllocAndFill(const int32_t input[1], int32_t** output, uint32_t* output_dim)
+{
+    *output_dim = 100;
+    *output = (int32_t*)ALLOC(*output_dim * sizeof(int32_t));
+    printf("Allocated %u output elements\n", *output_dim);
+
+    for (uint32_t i = 0; i < *output_dim; ++i) {
+        (*output)[i] = input[0];
+    }
+}
+